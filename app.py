@@ -14,14 +14,19 @@ Date: 2026
 
 import streamlit as st  # Framework web pour créer l'interface
 import pandas as pd  # Manipulation et analyse de données
+from pandas.api.types import union_categoricals  # Fusion de colonnes catégorielles
 import plotly.express as px  # Graphiques interactifs (express API)
 import plotly.graph_objects as go  # Graphiques interactifs (API avancée)
 from datetime import datetime, timedelta  # Gestion des dates et heures
 import time  # Pour les délais et le timing
 
 # Modules personnalisés du projet
-from db import get_db  # Gestionnaire de base de données MongoDB
-from weather_service import update_weather_data  # Service de récupération météo
+from db import HISTORY_BUCKETS, LIVE_POLL_INTERVAL, get_db, select_bucket  # Gestionnaire de base de données MongoDB
+from weather_service import MOROCCAN_CITIES  # Villes couvertes par le service météo
+from scheduler import INGESTION_INTERVAL, INGESTION_MODE, INGESTION_USE_MOCK, get_scheduler  # Ingestion en arrière-plan
+from live import LiveFeed  # Derniers relevés reçus en direct
+from perf import PhaseTimer  # Chronométrage des phases d'affichage
+from metrics import start_exporters  # Exposition des métriques d'exécution
 
 # ============================================================================
 # CONFIGURATION DE LA PAGE
@@ -34,6 +39,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"  # Barre latérale ouverte par défaut
 )
 
+# Chronométrage des phases de cette exécution (relu par benchmark_app.py)
+timer = PhaseTimer()
+
 # ============================================================================
 # CONSTANTES - Valeurs utilisées dans toute l'application
 # ============================================================================
@@ -41,55 +49,6 @@ st.set_page_config(
 # Couleur de fond transparente pour les graphiques (évite la duplication)
 TRANSPARENT_BG = 'rgba(0,0,0,0)'
 
-# Liste complète des villes marocaines - Couverture nationale
-MOROCCAN_CITIES = [
-    # Grandes métropoles
-    "Casablanca",      # Capitale économique
-    "Rabat",           # Capitale administrative
-    "Marrakech",       # Ville impériale et touristique
-    "Fès",             # Ville impériale
-    "Tanger",          # Ville du détroit
-    "Agadir",          # Capitale du Souss
-    
-    # Villes impériales et régionales
-    "Meknès",          # Ville impériale
-    "Oujda",           # Capitale de l'Oriental
-    "Tétouan",         # Capitale du Nord
-    "Kenitra",         # Ville du Gharb
-    
-    # Villes côtières atlantiques
-    "Essaouira",       # Ville côtière artistique
-    "El Jadida",       # Ville côtière historique
-    "Safi",            # Port de pêche
-    "Mohammedia",      # Ville portuaire
-    "Larache",         # Ville côtière nord
-    "Asilah",          # Station balnéaire
-    
-    # Villes côtières méditerranéennes
-    "Nador",           # Ville du Rif oriental
-    "Al Hoceima",      # Perle de la Méditerranée
-    
-    # Villes de l'intérieur
-    "Béni Mellal",     # Capitale du Tadla
-    "Khouribga",       # Ville minière
-    "Taza",            # Porte de l'Oriental
-    "Khemisset",       # Ville du plateau central
-    "Settat",          # Ville agricole
-    
-    # Villes du Sud
-    "Laâyoune",        # Capitale des provinces du Sud
-    "Dakhla",          # Ville saharienne côtière
-    "Guelmim",         # Porte du désert
-    "Tan-Tan",         # Ville saharienne
-    "Taroudant",       # Petite Marrakech
-    "Ouarzazate",      # Porte du désert
-    
-    # Autres villes importantes
-    "Errachidia",      # Capitale du Tafilalet
-    "Ifrane",          # Petite Suisse marocaine
-    "Ksar El Kebir"    # Ville du Nord-Ouest
-]
-
 # Labels pour les métriques (évite la duplication)
 LABEL_WIND_SPEED = "Wind Speed"
 LABEL_HUMIDITY = "Humidity"
@@ -229,6 +188,39 @@ def init_database():
 # Créer la connexion à la base de données
 db = init_database()
 
+@st.cache_resource  # Une seule écoute MongoDB partagée par toutes les sessions
+def get_live_feed() -> LiveFeed:
+    """
+    Démarre l'écoute des nouveaux relevés (change stream ou suivi par _id).
+    Les conditions actuelles sont lues en mémoire, sans requête par visiteur.
+    
+    Returns:
+        LiveFeed: Flux partagé des derniers relevés par ville
+    """
+    feed = LiveFeed(db)
+    feed.start()
+    return feed
+
+# Démarrer l'écoute des nouveaux relevés
+live_feed = get_live_feed()
+
+# Relevés déjà reçus et heure de cet affichage (voir watch_updates en fin de page)
+st.session_state["feed_version"] = live_feed.version
+st.session_state["page_run_at"] = time.monotonic()
+
+@st.cache_resource  # Une seule exposition des métriques par processus
+def init_metrics():
+    """
+    Démarre l'endpoint Prometheus et/ou l'export JSON des métriques
+    s'ils sont configurés (METRICS_PORT, METRICS_DUMP_FILE).
+    """
+    start_exporters()
+
+init_metrics()
+
+# Planificateur unique du processus (un seul mode, fixé par INGESTION_USE_MOCK)
+scheduler = get_scheduler(MOROCCAN_CITIES, db)
+
 # ============================================================================
 # INTERFACE UTILISATEUR - BARRE LATÉRALE (SIDEBAR)
 # ============================================================================
@@ -269,31 +261,143 @@ time_range = st.sidebar.slider(
 st.sidebar.markdown("---")  # Ligne de séparation
 st.sidebar.subheader("Mise à jour des données")
 
-# Case à cocher pour utiliser des données simulées
-use_mock = st.sidebar.checkbox(
-    "Utiliser données simulées (test)", 
-    value=False  # Désactivé par défaut pour utiliser l'API réelle
-)
+# Le mode simulé est fixé par la configuration (commun à toutes les sessions)
+if INGESTION_USE_MOCK:
+    st.sidebar.caption("Ingestion en données simulées (INGESTION_USE_MOCK)")
 
 # Bouton de rafraîchissement manuel
 if st.sidebar.button("Actualiser maintenant"):
     with st.spinner("Récupération des données météo..."):
-        # Mettre à jour les données pour toutes les villes disponibles
-        update_weather_data(available_cities, db, use_mock=use_mock)
-        st.sidebar.success("Données mises à jour avec succès")
+        # Mettre à jour les données pour toutes les villes (une seule ingestion à la fois)
+        results = scheduler.run_once()
+        if results is None:
+            st.sidebar.info("Une mise à jour est déjà en cours")
+        else:
+            # Résumer le résultat de la mise à jour par statut
+            statuses = [r["status"] for r in results]
+            st.sidebar.success(
+                f"Données mises à jour : {statuses.count('ok')} réelles, "
+                f"{statuses.count('mock')} simulées, {statuses.count('unchanged')} inchangées, "
+                f"{statuses.count('failed')} en échec"
+            )
         time.sleep(1)  # Pause de 1 seconde
         st.rerun()  # Recharger l'application pour afficher les nouvelles données
 
-# Case à cocher pour l'auto-rafraîchissement
-auto_refresh = st.sidebar.checkbox("Auto-refresh (1 min)", value=False)
+def toggle_ingestion():
+    """
+    Démarre ou arrête le planificateur partagé quand la case est modifiée.
+    """
+    if st.session_state["auto_refresh"]:
+        scheduler.start()
+    else:
+        scheduler.stop()
+
+# Case à cocher pour l'auto-rafraîchissement. En mode "embedded", elle reflète
+# et pilote le planificateur partagé par toutes les sessions.
+if INGESTION_MODE == "embedded":
+    st.session_state["auto_refresh"] = scheduler.is_running
+auto_refresh = st.sidebar.checkbox(
+    f"Auto-refresh ({INGESTION_INTERVAL:.0f} s)",
+    key="auto_refresh",
+    on_change=toggle_ingestion if INGESTION_MODE == "embedded" else None
+)
 
 # Si l'auto-refresh est activé
 if auto_refresh:
-    st.sidebar.info("Actualisation automatique activée (1 min)")
-    time.sleep(60)  # Attendre 60 secondes
-    # Mettre à jour les données
-    update_weather_data(available_cities, db, use_mock=use_mock)
-    st.rerun()  # Recharger l'application
+    if INGESTION_MODE == "embedded":
+        st.sidebar.info(f"Ingestion automatique active (toutes les {INGESTION_INTERVAL:.0f} s)")
+    else:
+        # L'ingestion est assurée par un processus séparé (python scheduler.py)
+        st.sidebar.info("Ingestion assurée par le planificateur externe")
+
+# ============================================================================
+# CHARGEMENT DES DONNÉES (UNE SEULE FOIS PAR EXÉCUTION)
+# ============================================================================
+
+def append_rows(df: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute de nouveaux relevés à la fin d'un historique en conservant
+    les colonnes catégorielles (les catégories des deux parties sont réunies).
+    
+    Args:
+        df (pd.DataFrame): Historique existant
+        new_rows (pd.DataFrame): Relevés plus récents, mêmes colonnes
+        
+    Returns:
+        pd.DataFrame: Nouvel historique (les DataFrames d'entrée ne sont pas modifiés)
+    """
+    combined = pd.concat([df, new_rows], ignore_index=True)
+    for col in df.select_dtypes('category').columns:
+        combined[col] = union_categoricals([df[col], new_rows[col]])
+    return combined
+
+
+def load_history(city: str, hours: int) -> pd.DataFrame:
+    """
+    Charge l'historique d'une ville sous forme de DataFrame typé.
+    Appelée une seule fois par exécution : le même DataFrame alimente
+    les onglets Tendances et Historique.
+    
+    L'historique est conservé dans la session : lors des exécutions suivantes,
+    seuls les relevés postérieurs au dernier point connu sont demandés à
+    MongoDB, puis les points sortis de la fenêtre sont retirés.
+    
+    Args:
+        city (str): Nom de la ville
+        hours (int): Nombre d'heures à charger
+        
+    Returns:
+        pd.DataFrame: Relevés triés par date (timestamp en datetime64), vide si aucune donnée
+    """
+    buffer = st.session_state.get("history_buffer")
+    
+    # Le tampon n'est réutilisable que pour la même ville et une fenêtre qu'il couvre
+    if buffer is None or buffer["city"] != city or buffer["hours"] < hours or buffer["df"].empty:
+        # Chargement complet (projection MongoDB et types compacts)
+        df = db.get_history_frame(city, hours=hours)
+    else:
+        # Chargement incrémental : uniquement les nouveaux relevés
+        df = buffer["df"]
+        last_timestamp = df['timestamp'].iloc[-1].to_pydatetime()
+        new_rows = db.get_history_frame(city, hours=hours, since=last_timestamp)
+        if not new_rows.empty:
+            df = append_rows(df, new_rows)
+    
+    # Retirer les points sortis de la fenêtre
+    window_start = pd.Timestamp(datetime.now() - timedelta(hours=hours))
+    if not df.empty and df['timestamp'].iloc[0] < window_start:
+        df = df[df['timestamp'] >= window_start].reset_index(drop=True)
+    
+    st.session_state["history_buffer"] = {"city": city, "hours": hours, "df": df}
+    return df
+
+
+def downsample(df: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """
+    Agrège les relevés par intervalle pour limiter le nombre de points des graphiques.
+    
+    Args:
+        df (pd.DataFrame): Relevés bruts (résultat de load_history)
+        bucket (str): Intervalle d'agrégation (clé de HISTORY_BUCKETS, ex: "5min")
+        
+    Returns:
+        pd.DataFrame: Un point par intervalle (moyennes, et maximum du vent)
+    """
+    minutes = HISTORY_BUCKETS[bucket][2]
+    resampled = df.resample(f"{minutes}min", on='timestamp').agg(
+        temperature=('temperature', 'mean'),
+        humidity=('humidity', 'mean'),
+        pressure=('pressure', 'mean'),
+        wind_speed=('wind_speed', 'mean'),
+        wind_speed_max=('wind_speed', 'max')
+    )
+    # Retirer les intervalles sans relevé
+    return resampled.dropna(subset=['temperature']).reset_index()
+
+
+# Historique de la ville sélectionnée, partagé par les onglets
+with timer.phase("commun", "db"):
+    history_df = load_history(selected_city, time_range)
 
 # ============================================================================
 # EN-TÊTE PRINCIPAL
@@ -321,10 +425,15 @@ tab1, tab2, tab3, tab4 = st.tabs([
 with tab1:
     st.header(f"Conditions Météorologiques Actuelles - {selected_city}")
     
-    # Récupérer les données les plus récentes pour la ville sélectionnée
-    latest = db.get_latest_weather(selected_city)
+    # Dernier relevé de la ville (table en mémoire tenue à jour par le flux en direct)
+    with timer.phase("vue_generale", "db"):
+        latest = db.get_latest_weather(selected_city)
     
     if latest:
+        # Signaler les relevés simulés (mode mock ou aucun fournisseur disponible)
+        if latest.get("source") == "mock":
+            st.warning("Relevé simulé : mode mock actif ou aucun fournisseur météo disponible")
+        
         # --- CARTES KPI (Key Performance Indicators) ---
         # Créer 4 colonnes de même largeur
         col1, col2, col3, col4 = st.columns(4)
@@ -412,78 +521,82 @@ with tab1:
 with tab2:
     st.header(f"Analyse des Tendances Météorologiques - {selected_city}")
     
-    # Récupérer l'historique météo pour la plage temporelle sélectionnée
-    historical = db.get_historical_weather(selected_city, hours=time_range)
-    
     # Vérifier qu'il y a au moins 2 points de données pour tracer un graphique
-    if historical and len(historical) > 1:
-        # Convertir les données en DataFrame pandas pour faciliter la manipulation
-        df = pd.DataFrame(historical)
-        # Convertir la colonne timestamp en type datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+    if len(history_df) > 1:
+        # Agréger l'historique partagé (quelques centaines de points au maximum)
+        bucket = select_bucket(time_range)
+        with timer.phase("tendances", "dataframe"):
+            df = downsample(history_df, bucket)
+        
+        # Rappeler l'intervalle d'agrégation des courbes
+        st.caption(f"Valeurs moyennes par intervalle de {bucket}")
         
         # --- GRAPHIQUE 1: ÉVOLUTION DE LA TEMPÉRATURE ---
-        fig_temp = px.line(
-            df,  # DataFrame source
-            x='timestamp',  # Axe X: temps
-            y='temperature',  # Axe Y: température
-            title='Évolution de la Température',  # Titre du graphique
-            labels={
-                'temperature': 'Température (°C)',  # Label axe Y
-                'timestamp': 'Temps'  # Label axe X
-            }
-        )
-        # Personnaliser la ligne
-        fig_temp.update_traces(
-            line_color='#FF6B6B',  # Couleur rouge-orangé
-            line_width=3  # Épaisseur de la ligne
-        )
-        # Personnaliser le style du graphique
-        fig_temp.update_layout(
-            plot_bgcolor=TRANSPARENT_BG,  # Fond transparent
-            paper_bgcolor=TRANSPARENT_BG,  # Papier transparent
-            font={'color': '#e2e8f0'},  # Texte clair
-            hovermode='x unified'  # Tooltip unifié sur l'axe X
-        )
+        with timer.phase("tendances", "figure"):
+            fig_temp = px.line(
+                df,  # DataFrame source
+                x='timestamp',  # Axe X: temps
+                y='temperature',  # Axe Y: température
+                title='Évolution de la Température',  # Titre du graphique
+                labels={
+                    'temperature': 'Température (°C)',  # Label axe Y
+                    'timestamp': 'Temps'  # Label axe X
+                }
+            )
+            # Personnaliser la ligne
+            fig_temp.update_traces(
+                line_color='#FF6B6B',  # Couleur rouge-orangé
+                line_width=3  # Épaisseur de la ligne
+            )
+            # Personnaliser le style du graphique
+            fig_temp.update_layout(
+                plot_bgcolor=TRANSPARENT_BG,  # Fond transparent
+                paper_bgcolor=TRANSPARENT_BG,  # Papier transparent
+                font={'color': '#e2e8f0'},  # Texte clair
+                hovermode='x unified'  # Tooltip unifié sur l'axe X
+            )
         # Afficher le graphique (pleine largeur)
-        st.plotly_chart(fig_temp, use_container_width=True)
+        with timer.phase("tendances", "serialisation"):
+            st.plotly_chart(fig_temp, use_container_width=True)
         
         # --- GRAPHIQUE 2: HUMIDITÉ & VENT (DOUBLE AXE Y) ---
-        fig_multi = go.Figure()  # Créer une figure vide
-        
-        # Ajouter la trace pour l'humidité (axe Y gauche)
-        fig_multi.add_trace(go.Scatter(
-            x=df['timestamp'],  # Axe X
-            y=df['humidity'],  # Axe Y
-            name='Humidité (%)',  # Nom dans la légende
-            line={'color': '#4ECDC4', 'width': 2}  # Style de ligne
-        ))
-        
-        # Ajouter la trace pour le vent (axe Y droit)
-        fig_multi.add_trace(go.Scatter(
-            x=df['timestamp'],
-            y=df['wind_speed'],
-            name='Vent (km/h)',
-            line={'color': '#95E1D3', 'width': 2},
-            yaxis='y2'  # Utiliser le deuxième axe Y
-        ))
-        
-        # Configuration du layout avec double axe Y
-        fig_multi.update_layout(
-            title='Humidité et Vitesse du Vent',
-            plot_bgcolor=TRANSPARENT_BG,
-            paper_bgcolor=TRANSPARENT_BG,
-            font={'color': '#e2e8f0'},
-            hovermode='x unified',
-            yaxis={'title': 'Humidité (%)'},  # Axe Y gauche
-            yaxis2={  # Axe Y droit
-                'title': 'Vent (km/h)',
-                'overlaying': 'y',  # Superposer sur le même graphique
-                'side': 'right'  # Positionner à droite
-            }
-        )
+        with timer.phase("tendances", "figure"):
+            fig_multi = go.Figure()  # Créer une figure vide
+            
+            # Ajouter la trace pour l'humidité (axe Y gauche)
+            fig_multi.add_trace(go.Scatter(
+                x=df['timestamp'],  # Axe X
+                y=df['humidity'],  # Axe Y
+                name='Humidité (%)',  # Nom dans la légende
+                line={'color': '#4ECDC4', 'width': 2}  # Style de ligne
+            ))
+            
+            # Ajouter la trace pour le vent (axe Y droit)
+            fig_multi.add_trace(go.Scatter(
+                x=df['timestamp'],
+                y=df['wind_speed'],
+                name='Vent (km/h)',
+                line={'color': '#95E1D3', 'width': 2},
+                yaxis='y2'  # Utiliser le deuxième axe Y
+            ))
+            
+            # Configuration du layout avec double axe Y
+            fig_multi.update_layout(
+                title='Humidité et Vitesse du Vent',
+                plot_bgcolor=TRANSPARENT_BG,
+                paper_bgcolor=TRANSPARENT_BG,
+                font={'color': '#e2e8f0'},
+                hovermode='x unified',
+                yaxis={'title': 'Humidité (%)'},  # Axe Y gauche
+                yaxis2={  # Axe Y droit
+                    'title': 'Vent (km/h)',
+                    'overlaying': 'y',  # Superposer sur le même graphique
+                    'side': 'right'  # Positionner à droite
+                }
+            )
         
-        st.plotly_chart(fig_multi, use_container_width=True)
+        with timer.phase("tendances", "serialisation"):
+            st.plotly_chart(fig_multi, use_container_width=True)
         
         # --- ANALYSE AUTOMATIQUE ---
         st.markdown("---")
@@ -502,11 +615,11 @@ with tab2:
         )
         st.info(f"La pression atmosphérique est {pressure_trend}.")
         
-        # Alerte vent fort
-        if df['wind_speed'].max() > 20:
+        # Alerte vent fort (maximum de chaque intervalle, pas la moyenne)
+        if df['wind_speed_max'].max() > 20:
             st.warning(
                 f"Vents forts détectés ! "
-                f"Pic: {df['wind_speed'].max():.1f} km/h"
+                f"Pic: {df['wind_speed_max'].max():.1f} km/h"
             )
     else:
         # Données insuffisantes
@@ -525,73 +638,86 @@ with tab3:
     # Vérifier qu'au moins une ville est sélectionnée
     if comparison_cities:
         # Récupérer les données pour toutes les villes sélectionnées
-        comparison_data = db.get_comparison_data(comparison_cities)
+        with timer.phase("comparaison", "db"):
+            comparison_data = db.get_comparison_data(comparison_cities)
         
         if comparison_data:
             # Créer un DataFrame pour la comparaison
-            comp_df = pd.DataFrame([
-                {
-                    'Ville': city,
-                    LABEL_TEMPERATURE: data['temperature'],
-                    LABEL_HUMIDITY: data['humidity'],
-                    LABEL_WIND_SPEED: data['wind_speed'],
-                    'Pression': data['pressure']
-                }
-                for city, data in comparison_data.items()
-            ])
+            with timer.phase("comparaison", "dataframe"):
+                comp_df = pd.DataFrame([
+                    {
+                        'Ville': city,
+                        LABEL_TEMPERATURE: data['temperature'],
+                        LABEL_HUMIDITY: data['humidity'],
+                        LABEL_WIND_SPEED: data['wind_speed'],
+                        'Pression': data['pressure']
+                    }
+                    for city, data in comparison_data.items()
+                ])
             
-            # --- GRAPHIQUE 1: COMPARAISON DES TEMPÉRATURES ---
-            fig_comp_temp = px.bar(
-                comp_df,
-                x='Ville',
-                y=LABEL_TEMPERATURE,
-                title='Comparaison des Températures',
-                color=LABEL_TEMPERATURE,  # Couleur basée sur la température
-                color_continuous_scale='RdYlBu_r'  # Palette: Rouge (chaud) -> Bleu (froid)
-            )
-            fig_comp_temp.update_layout(
-                plot_bgcolor=TRANSPARENT_BG,
-                paper_bgcolor=TRANSPARENT_BG,
-                font={'color': '#e2e8f0'}
-            )
-            st.plotly_chart(fig_comp_temp, use_container_width=True)
+            # Signaler les villes dont le dernier relevé est simulé
+            mock_cities = [city for city, data in comparison_data.items() if data.get("source") == "mock"]
+            if mock_cities:
+                st.warning(f"Relevés simulés : {', '.join(mock_cities)}")
             
-            # --- GRAPHIQUES 2 & 3: HUMIDITÉ ET VENT (CÔTE À CÔTE) ---
-            col1, col2 = st.columns(2)
-            
-            # Colonne gauche: Humidité
-            with col1:
-                fig_humidity = px.bar(
+            # --- GRAPHIQUE 1: COMPARAISON DES TEMPÉRATURES ---
+            with timer.phase("comparaison", "figure"):
+                fig_comp_temp = px.bar(
                     comp_df,
                     x='Ville',
-                    y=LABEL_HUMIDITY,
-                    title='Comparaison de l\'Humidité',
-                    color=LABEL_HUMIDITY,
-                    color_continuous_scale='Blues'  # Palette bleue
+                    y=LABEL_TEMPERATURE,
+                    title='Comparaison des Températures',
+                    color=LABEL_TEMPERATURE,  # Couleur basée sur la température
+                    color_continuous_scale='RdYlBu_r'  # Palette: Rouge (chaud) -> Bleu (froid)
                 )
-                fig_humidity.update_layout(
+                fig_comp_temp.update_layout(
                     plot_bgcolor=TRANSPARENT_BG,
                     paper_bgcolor=TRANSPARENT_BG,
                     font={'color': '#e2e8f0'}
                 )
-                st.plotly_chart(fig_humidity, use_container_width=True)
+            with timer.phase("comparaison", "serialisation"):
+                st.plotly_chart(fig_comp_temp, use_container_width=True)
+            
+            # --- GRAPHIQUES 2 & 3: HUMIDITÉ ET VENT (CÔTE À CÔTE) ---
+            col1, col2 = st.columns(2)
+            
+            # Colonne gauche: Humidité
+            with col1:
+                with timer.phase("comparaison", "figure"):
+                    fig_humidity = px.bar(
+                        comp_df,
+                        x='Ville',
+                        y=LABEL_HUMIDITY,
+                        title='Comparaison de l\'Humidité',
+                        color=LABEL_HUMIDITY,
+                        color_continuous_scale='Blues'  # Palette bleue
+                    )
+                    fig_humidity.update_layout(
+                        plot_bgcolor=TRANSPARENT_BG,
+                        paper_bgcolor=TRANSPARENT_BG,
+                        font={'color': '#e2e8f0'}
+                    )
+                with timer.phase("comparaison", "serialisation"):
+                    st.plotly_chart(fig_humidity, use_container_width=True)
             
             # Colonne droite: Vent
             with col2:
-                fig_wind = px.bar(
-                    comp_df,
-                    x='Ville',
-                    y=LABEL_WIND_SPEED,
-                    title='Comparaison du Vent',
-                    color=LABEL_WIND_SPEED,
-                    color_continuous_scale='Greens'  # Palette verte
-                )
-                fig_wind.update_layout(
-                    plot_bgcolor=TRANSPARENT_BG,
-                    paper_bgcolor=TRANSPARENT_BG,
-                    font={'color': '#e2e8f0'}
-                )
-                st.plotly_chart(fig_wind, use_container_width=True)
+                with timer.phase("comparaison", "figure"):
+                    fig_wind = px.bar(
+                        comp_df,
+                        x='Ville',
+                        y=LABEL_WIND_SPEED,
+                        title='Comparaison du Vent',
+                        color=LABEL_WIND_SPEED,
+                        color_continuous_scale='Greens'  # Palette verte
+                    )
+                    fig_wind.update_layout(
+                        plot_bgcolor=TRANSPARENT_BG,
+                        paper_bgcolor=TRANSPARENT_BG,
+                        font={'color': '#e2e8f0'}
+                    )
+                with timer.phase("comparaison", "serialisation"):
+                    st.plotly_chart(fig_wind, use_container_width=True)
             
             # --- ANALYSE COMPARATIVE AUTOMATIQUE ---
             st.markdown("---")
@@ -634,50 +760,53 @@ with tab3:
 with tab4:
     st.header("Données Historiques")
     
-    # Récupérer l'historique
-    historical = db.get_historical_weather(selected_city, hours=time_range)
-    
-    if historical:
-        # Convertir en DataFrame
-        df = pd.DataFrame(historical)
-        
-        # Supprimer le champ _id de MongoDB (non nécessaire pour l'affichage)
-        if '_id' in df.columns:
-            df = df.drop('_id', axis=1)
-        
-        # Formater le timestamp en chaîne lisible
-        df['timestamp'] = pd.to_datetime(df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Réorganiser les colonnes dans un ordre logique
-        column_order = [
-            'timestamp', 'city', 'temperature', 'humidity', 
-            'pressure', 'wind_speed', 'weather', 'description'
-        ]
-        # Garder seulement les colonnes qui existent
-        df = df[[col for col in column_order if col in df.columns]]
+    if not history_df.empty:
+        with timer.phase("historique", "dataframe"):
+            # Copier l'historique partagé avant de le formater pour l'affichage
+            df = history_df.copy()
+            
+            # Formater le timestamp en chaîne lisible
+            df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Réorganiser les colonnes dans un ordre logique
+            column_order = [
+                'timestamp', 'city', 'temperature', 'humidity', 
+                'pressure', 'wind_speed', 'weather', 'description'
+            ]
+            # Garder seulement les colonnes qui existent
+            df = df[[col for col in column_order if col in df.columns]]
         
         # Afficher le tableau interactif
-        st.dataframe(
-            df,
-            use_container_width=True,  # Utiliser toute la largeur
-            height=400  # Hauteur fixe avec scroll
-        )
+        with timer.phase("historique", "serialisation"):
+            st.dataframe(
+                df,
+                use_container_width=True,  # Utiliser toute la largeur
+                height=400  # Hauteur fixe avec scroll
+            )
         
         # --- STATISTIQUES RÉSUMÉES ---
         st.markdown("---")
         st.subheader(" Statistiques")
         
+        # Statistiques pré-agrégées par heure (calcul depuis le tableau si indisponibles)
+        with timer.phase("historique", "db"):
+            summary = db.get_rollup_summary(selected_city, hours=time_range) or {
+                "temperature_max": df['temperature'].max(),
+                "temperature_min": df['temperature'].min(),
+                "temperature_mean": df['temperature'].mean()
+            }
+        
         # Afficher 4 métriques statistiques
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Temp Max", f"{df['temperature'].max():.1f}°C")
+            st.metric("Temp Max", f"{summary['temperature_max']:.1f}°C")
         
         with col2:
-            st.metric("Temp Min", f"{df['temperature'].min():.1f}°C")
+            st.metric("Temp Min", f"{summary['temperature_min']:.1f}°C")
         
         with col3:
-            st.metric("Temp Moy", f"{df['temperature'].mean():.1f}°C")
+            st.metric("Temp Moy", f"{summary['temperature_mean']:.1f}°C")
         
         with col4:
             st.metric("Enregistrements", len(df))
@@ -686,7 +815,8 @@ with tab4:
         st.markdown("---")
         
         # Convertir le DataFrame en CSV
-        csv = df.to_csv(index=False).encode('utf-8')
+        with timer.phase("historique", "serialisation"):
+            csv = df.to_csv(index=False).encode('utf-8')
         
         # Bouton de téléchargement
         st.download_button(
@@ -703,3 +833,27 @@ with tab4:
 # ============================================================================
 
 st.markdown("---")
+
+# Durées de cette exécution par onglet et par phase
+st.session_state["phase_timings"] = timer.report()
+
+# ============================================================================
+# AUTO-RAFRAÎCHISSEMENT DE L'AFFICHAGE
+# ============================================================================
+
+@st.fragment(run_every=LIVE_POLL_INTERVAL)
+def watch_updates():
+    """
+    Vérifie toutes les LIVE_POLL_INTERVAL secondes, sans bloquer le script,
+    si le flux en direct a reçu des relevés depuis cet affichage, et relance
+    alors l'application : les nouveaux relevés apparaissent en quelques
+    secondes. Avec l'auto-refresh, la page est aussi relancée au moins toutes
+    les INGESTION_INTERVAL secondes.
+    """
+    new_readings = live_feed.version != st.session_state["feed_version"]
+    refresh_due = auto_refresh and time.monotonic() - st.session_state["page_run_at"] >= INGESTION_INTERVAL
+    if new_readings or refresh_due:
+        st.rerun()
+
+# L'ingestion tourne en arrière-plan : l'interface se contente de relire la base
+watch_updates()
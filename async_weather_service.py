@@ -0,0 +1,299 @@
+"""
+Service Météo Asynchrone - Climatrack Maroc
+===========================================
+Variante asyncio de WeatherService pour récupérer un grand nombre de lieux
+(communes, points de grille...) en un cycle : un seul client httpx avec pool
+de connexions, et un sémaphore qui borne le nombre de requêtes simultanées.
+Le temps étant passé à attendre le réseau, un seul cœur suffit pour environ
+1 000 lieux par cycle.
+
+Les clés, fournisseurs, disjoncteurs, quotas, cache des réponses et fonctions
+de standardisation sont ceux du WeatherService utilisé : les relevés ont
+exactement le même format que ceux du service synchrone.
+"""
+
+import asyncio  # Pour la boucle d'événements et le sémaphore
+import os  # Pour accéder aux variables d'environnement
+import random  # Pour le jitter du backoff
+import time  # Pour mesurer la latence de chaque lieu
+from typing import Dict, List, Optional, Tuple  # Pour le typage des fonctions
+
+import httpx  # Client HTTP asynchrone
+from dotenv import load_dotenv  # Pour charger les variables depuis le fichier .env
+
+from logging_config import get_logger  # Journalisation structurée
+from metrics import PROVIDER_LATENCY, PROVIDER_RETRIES  # Métriques d'exécution
+from weather_service import (  # Service synchrone et sa configuration HTTP
+    CONNECT_TIMEOUT,
+    MAX_RETRIES,
+    MAX_RETRY_AFTER,
+    READ_TIMEOUT,
+    RETRY_BACKOFF,
+    RETRY_STATUS_CODES,
+    ProviderFailure,
+    WeatherService,
+    _error_fields,
+    _is_provider_failure
+)
+
+# Charger les variables d'environnement depuis le fichier .env
+load_dotenv()
+
+# Journal du module (niveau réglable avec LOG_LEVELS=async_weather_service=...)
+logger = get_logger("async_weather_service")
+
+# Nombre maximal de requêtes simultanées (et de connexions du pool)
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "100"))
+
+
+class AsyncWeatherService:
+    """
+    Récupération asynchrone des données météo de nombreux lieux.
+    
+    Utilisation :
+        async with AsyncWeatherService() as service:
+            results = await service.fetch_many(cities)
+    ou, depuis du code synchrone :
+        results = AsyncWeatherService().fetch_many_sync(cities)
+    """
+    
+    def __init__(self, service: Optional[WeatherService] = None, concurrency: Optional[int] = None):
+        """
+        Args:
+            service (Optional[WeatherService]): Service synchrone dont la configuration,
+                                                le cache et les quotas sont réutilisés
+                                                (par défaut: un nouveau WeatherService)
+            concurrency (Optional[int]): Requêtes simultanées (par défaut: ASYNC_CONCURRENCY)
+        """
+        self.service = service or WeatherService()
+        self.concurrency = concurrency or ASYNC_CONCURRENCY
+        
+        # Client HTTP et sémaphore, créés à l'ouverture (liés à la boucle d'événements)
+        self.client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    async def __aenter__(self) -> "AsyncWeatherService":
+        """
+        Ouvre le client HTTP partagé par toutes les requêtes.
+        """
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency
+            )
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        """
+        Ferme le client HTTP et libère les connexions du pool.
+        """
+        await self.client.aclose()
+        self.client = None
+    
+    @staticmethod
+    def _retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+        """
+        Délai avant une nouvelle tentative : Retry-After (plafonné à
+        MAX_RETRY_AFTER) s'il est fourni, sinon backoff exponentiel avec jitter.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+        return RETRY_BACKOFF * (2 ** attempt) + random.uniform(0, RETRY_BACKOFF)
+    
+    async def _get(self, provider: str, url: str, params: Dict, headers: Dict) -> httpx.Response:
+        """
+        Requête GET avec la même politique de nouvelles tentatives que la
+        session synchrone (erreurs réseau et codes 429/5xx).
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = await self.client.get(url, params=params, headers=headers)
+            except httpx.TransportError:
+                if attempt == MAX_RETRIES:
+                    raise
+                response = None
+            
+            if response is not None and (
+                response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES
+            ):
+                return response
+            PROVIDER_RETRIES.inc(provider=provider)
+            await asyncio.sleep(self._retry_delay(response, attempt))
+    
+    async def _fetch_from(self, provider: str, city: str, call: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Récupère les données d'un lieu auprès d'un fournisseur.
+        
+        Args:
+            provider (str): Fournisseur ("openweather" ou "weatherapi")
+            city (str): Nom du lieu
+            call (Optional[Dict]): État de l'appel, "sent" passe à True une fois
+                                   la requête envoyée (le quota local obtenu)
+        
+        Returns:
+            Optional[Dict]: Données météo standardisées ou None
+        
+        Raises:
+            ProviderFailure: Erreur réseau, délai dépassé ou réponse 5xx
+        """
+        service = self.service
+        start = None
+        outcome = "error"
+        try:
+            url, params = service._build_request(provider, city)
+            
+            # Respecter le quota hors de la boucle (transaction SQLite synchrone) :
+            # jeton immédiat si possible, sinon attente dans un thread
+            if not await asyncio.to_thread(service.rate_limiters[provider].acquire, 0):
+                if not await asyncio.to_thread(service._acquire_call, provider, city):
+                    return None
+            
+            start = time.perf_counter()
+            if call is not None:
+                call["sent"] = True
+            response = await self._get(provider, url, params, service._conditional_headers(provider, city))
+            
+            # Données inchangées depuis la réponse en cache
+            if response.status_code == 304:
+                outcome = "not_modified"
+                return service.response_cache.revalidate(provider, city)
+            
+            response.raise_for_status()
+            
+            # Hors de la boucle : une nouvelle ville réécrit le fichier des identifiants
+            result = await asyncio.to_thread(
+                service._parse_response, provider, city, response.json(), response.headers.get("ETag")
+            )
+            outcome = "ok"
+            return result
+        
+        except httpx.HTTPError as e:
+            logger.error(
+                "Échec de la requête API", extra={"city": city, "provider": provider, **_error_fields(e)}
+            )
+            if _is_provider_failure(e):
+                raise ProviderFailure(provider) from e
+            return None
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.error(
+                "Format de réponse API inattendu", extra={"city": city, "provider": provider, "error": str(e)}
+            )
+            return None
+        finally:
+            # Requête abandonnée à l'échéance comprise (outcome "error")
+            if start is not None:
+                PROVIDER_LATENCY.observe(
+                    time.perf_counter() - start, provider=provider, kind="city", outcome=outcome
+                )
+    
+    async def fetch_weather(self, city: str) -> Optional[Dict]:
+        """
+        Récupère les données météo actuelles d'un lieu (même logique que
+        WeatherService.fetch_weather : cache, priorité des fournisseurs,
+        disjoncteurs).
+        
+        Args:
+            city (str): Nom du lieu
+        
+        Returns:
+            Optional[Dict]: Données météo standardisées ou None si aucun fournisseur n'a répondu
+        """
+        service = self.service
+        
+        async with self._semaphore:
+            for provider in service.providers:
+                # Réponse récente déjà en cache : pas d'appel API
+                cached = service.response_cache.get(provider, city)
+                if cached is not None:
+                    return cached
+                
+                # Fournisseur en panne : passer au suivant immédiatement
+                breaker = service.breakers[provider]
+                if not breaker.allow():
+                    continue
+                
+                data, provider_failed = None, False
+                call = {"sent": False}
+                try:
+                    data = await self._fetch_from(provider, city, call)
+                except ProviderFailure:
+                    provider_failed = True
+                except asyncio.CancelledError:
+                    # Requête abandonnée à l'échéance : comptée comme un délai dépassé
+                    # si elle a été envoyée ; en attente du quota local, le
+                    # fournisseur n'est pas en cause (essai semi-ouvert libéré)
+                    provider_failed = call["sent"]
+                    raise
+                finally:
+                    # Toujours conclure l'appel : un essai semi-ouvert ne reste jamais en cours
+                    breaker.record_outcome(bool(data), provider_failed)
+                
+                if data:
+                    return data
+        
+        return None
+    
+    async def fetch_many(
+        self,
+        cities: List[str],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Tuple[Optional[Dict], float]]:
+        """
+        Récupère tous les lieux en parallèle (au plus `concurrency` requêtes à la fois).
+        
+        Args:
+            cities (List[str]): Noms des lieux
+            timeout (Optional[float]): Durée maximale en secondes (par défaut: aucune)
+        
+        Returns:
+            Dict[str, Tuple[Optional[Dict], float]]: Par lieu terminé à temps, les données
+                                                     (None en cas d'échec) et la latence (s)
+        """
+        if not cities:
+            return {}
+        
+        # Ouvrir le client pour la durée de l'appel s'il ne l'est pas déjà
+        if self.client is None:
+            async with self:
+                return await self.fetch_many(cities, timeout)
+        
+        async def timed_fetch(city: str) -> Tuple[Optional[Dict], float]:
+            start = time.perf_counter()
+            data = await self.fetch_weather(city)
+            return data, time.perf_counter() - start
+        
+        tasks = {city: asyncio.create_task(timed_fetch(city)) for city in cities}
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        
+        # Abandonner les requêtes en retard
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        results = {}
+        for city, task in tasks.items():
+            if task not in done:
+                continue
+            if task.exception():
+                logger.error("Erreur inattendue", extra={"city": city, "error": repr(task.exception())})
+                continue
+            results[city] = task.result()
+        return results
+    
+    def fetch_many_sync(
+        self,
+        cities: List[str],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Tuple[Optional[Dict], float]]:
+        """
+        Version synchrone de fetch_many, pour update_weather_data et les scripts.
+        Ne pas appeler depuis une boucle d'événements déjà active.
+        """
+        return asyncio.run(self.fetch_many(cities, timeout))
@@ -0,0 +1,204 @@
+"""
+Benchmark de l'Interface Streamlit - Climatrack Maroc
+====================================================
+Exécute app.py sans navigateur (streamlit.testing.v1.AppTest) sur un
+historique simulé, pour plusieurs plages temporelles et nombres de villes
+comparées, et résume la durée de chaque phase de chaque onglet mesurée par
+perf.PhaseTimer : requêtes MongoDB, construction des DataFrames, des figures
+Plotly et sérialisation.
+
+Pour chaque scénario, une première exécution (chargement complet de
+l'historique) n'est pas mesurée ; les suivantes correspondent aux
+rafraîchissements d'une session ouverte. L'ingestion n'est jamais déclenchée :
+aucun fournisseur météo n'est appelé.
+
+Exemples :
+    python benchmark_app.py --backend mongomock --repeat 20 --json app_bench.json
+    python benchmark_app.py --backend mongomock --baseline app_bench.json
+"""
+
+import argparse  # Pour analyser les arguments de la ligne de commande
+import json  # Pour écrire et relire les résultats
+import os  # Pour localiser app.py
+import time  # Pour mesurer la durée de chaque exécution
+from datetime import datetime  # Pour horodater les résultats
+from itertools import product  # Pour combiner les paramètres des scénarios
+from typing import Dict, List, Optional  # Pour le typage des fonctions
+
+from streamlit.testing.v1 import AppTest  # Exécution de l'application sans navigateur
+
+import db as db_module  # Pour fournir la base de benchmark à l'application
+from benchmark_db import (  # Outils communs aux benchmarks
+    BENCH_CITIES,
+    COMPARISON_SIZES,
+    SEED_CADENCE,
+    create_client,
+    current_commit,
+    seed,
+    summarize
+)
+from db import WeatherDB  # Gestionnaire de base de données MongoDB
+
+# Script Streamlit mesuré
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Plages temporelles (heures) mesurées
+TIME_RANGES = [1, 24, 72]
+
+# Durée (jours) de l'historique simulé : couvre la plage maximale du curseur
+HISTORY_DAYS = 3
+
+
+def run_scenario(time_range: int, cities: int, repeat: int, warmup: int, timeout: float) -> List[Dict]:
+    """
+    Exécute l'application plusieurs fois avec les mêmes réglages et résume
+    les durées par onglet et par phase.
+    
+    Args:
+        time_range (int): Plage temporelle (heures) du curseur
+        cities (int): Nombre de villes comparées
+        repeat (int): Exécutions mesurées
+        warmup (int): Exécutions préalables non mesurées (au moins une)
+        timeout (float): Durée maximale d'une exécution (s)
+    
+    Returns:
+        List[Dict]: Une ligne de résultats par (onglet, phase), plus la durée
+                    de l'exécution complète vue par AppTest
+    """
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    at.sidebar.slider[0].set_value(time_range)
+    at.sidebar.multiselect[0].set_value(BENCH_CITIES[:cities])
+    
+    for _ in range(max(warmup, 1)):
+        at.run()
+    
+    timings: Dict[tuple, List[float]] = {}
+    errors = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        if at.exception:
+            errors += 1
+            continue
+        
+        timings.setdefault(("total", "apptest"), []).append(elapsed)
+        for tab, phases in at.session_state["phase_timings"].items():
+            for phase, duration in phases.items():
+                timings.setdefault((tab, phase), []).append(duration)
+    
+    if errors:
+        print(f"[ERREUR] {errors} exécution(s) en erreur ({time_range} h, {cities} villes)")
+    
+    scenario = f"{time_range}h/{cities}v"
+    return [
+        {
+            "scenario": scenario,
+            "time_range": time_range,
+            "cities": cities,
+            "tab": tab,
+            "phase": phase,
+            **summarize(durations, errors)
+        }
+        for (tab, phase), durations in sorted(timings.items())
+    ]
+
+
+def print_results(results: List[Dict], baseline: Optional[Dict[tuple, Dict]] = None):
+    """
+    Affiche les résultats sous forme de tableau, avec l'écart de p50 par
+    rapport à une exécution de référence si elle est fournie.
+    """
+    header = f"{'Scénario':>9} | {'Onglet':<13} | {'Phase':<13} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}"
+    if baseline:
+        header += f" | {'Δ p50':>7}"
+    print("\n" + header)
+    print("-" * len(header))
+    
+    for row in results:
+        line = (
+            f"{row['scenario']:>9} | {row['tab']:<13} | {row['phase']:<13} | "
+            f"{row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f} | {row['p99_ms']:>8.2f}"
+        )
+        if baseline:
+            reference = baseline.get((row["scenario"], row["tab"], row["phase"]))
+            if reference and reference["p50_ms"]:
+                line += f" | {100 * (row['p50_ms'] / reference['p50_ms'] - 1):>+6.0f}%"
+            else:
+                line += f" | {'-':>7}"
+        print(line)
+
+
+def load_baseline(path: str) -> Dict[tuple, Dict]:
+    """
+    Charge les résultats d'une exécution précédente, indexés par (scénario, onglet, phase).
+    """
+    with open(path, encoding="utf-8") as f:
+        content = json.load(f)
+    return {(row["scenario"], row["tab"], row["phase"]): row for row in content["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des exécutions de l'interface Streamlit")
+    parser.add_argument("--database", default="climatrack_bench", help="Base de données de benchmark")
+    parser.add_argument("--backend", choices=["mongo", "mongomock"], default="mongo", help="Serveur MongoDB ou mongomock")
+    parser.add_argument("--time-ranges", type=int, nargs="+", default=TIME_RANGES, help="Plages temporelles (heures)")
+    parser.add_argument("--cities", type=int, nargs="+", default=COMPARISON_SIZES, help="Nombres de villes comparées")
+    parser.add_argument("--repeat", type=int, default=20, help="Exécutions mesurées par scénario")
+    parser.add_argument("--warmup", type=int, default=1, help="Exécutions préalables non mesurées")
+    parser.add_argument("--timeout", type=float, default=60, help="Durée maximale d'une exécution (s)")
+    parser.add_argument("--no-cache", action="store_true", help="Désactiver le cache des lectures")
+    parser.add_argument("--json", help="Fichier où écrire les résultats")
+    parser.add_argument("--baseline", help="Résultats JSON de référence à comparer")
+    parser.add_argument("--keep", action="store_true", help="Conserver la base après le benchmark")
+    args = parser.parse_args()
+    
+    db = WeatherDB(
+        database=args.database,
+        cache_size=0 if args.no_cache else None,
+        client=create_client(args.backend)
+    )
+    if not db.connect():
+        raise SystemExit(1)
+    
+    # L'application utilise la base de benchmark (get_db retourne l'instance existante)
+    db_module._db_instance = db
+    
+    results = []
+    try:
+        db.client.drop_database(args.database)
+        db.connect()
+        print(f"Insertion de {HISTORY_DAYS} jours d'historique pour {len(BENCH_CITIES)} villes...")
+        seed(db, HISTORY_DAYS * 24 * 60 // SEED_CADENCE)
+        
+        for time_range, cities in product(args.time_ranges, args.cities):
+            print(f"[INFO] Scénario {time_range} h, {cities} villes")
+            results.extend(run_scenario(time_range, cities, args.repeat, args.warmup, args.timeout))
+    
+    finally:
+        if not args.keep:
+            db.client.drop_database(args.database)
+        db.close()
+    
+    print_results(results, load_baseline(args.baseline) if args.baseline else None)
+    
+    if args.json:
+        report = {
+            "meta": {
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "commit": current_commit(),
+                "backend": args.backend,
+                "repeat": args.repeat,
+                "cache": not args.no_cache
+            },
+            "results": results
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] Résultats écrits dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Benchmark de la Base de Données - Climatrack Maroc
+==================================================
+Mesure la latence (p50/p95/p99) et le débit de chaque méthode de WeatherDB
+sur des collections de tailles croissantes, ainsi que get_comparison_data
+face à l'ancienne implémentation (un find_one par ville).
+
+Les données sont insérées dans une base dédiée ('climatrack_bench' par défaut),
+supprimée à la fin du benchmark. Sans serveur MongoDB, --backend mongomock
+exécute le benchmark en mémoire (les latences ne sont alors comparables
+qu'entre elles).
+
+Les résultats peuvent être écrits en JSON (--json) puis comparés à ceux d'un
+autre commit (--baseline).
+
+Exemples :
+    python benchmark_db.py --sizes 10000 100000 --repeat 50 --json bench.json
+    python benchmark_db.py --sizes 10000 --baseline bench.json
+"""
+
+import argparse  # Pour analyser les arguments de la ligne de commande
+import json  # Pour écrire et relire les résultats
+import logging  # Pour compter les erreurs journalisées par WeatherDB
+import subprocess  # Pour identifier le commit mesuré
+import time  # Pour mesurer les durées
+from datetime import datetime  # Pour horodater les résultats
+from itertools import chain  # Pour aplatir les lots de documents
+from typing import Callable, Dict, List, Optional  # Pour le typage des fonctions
+
+import numpy as np  # Pour les percentiles
+
+from db import WeatherDB  # Gestionnaire de base de données MongoDB
+from logging_config import ROOT_LOGGER  # Journal parent des modules du projet
+from seed_data import generate_history, seed_history  # Historique simulé en masse
+from weather_service import MOROCCAN_CITIES  # Villes du dashboard
+
+# Villes utilisées pour le benchmark (les 32 villes du dashboard)
+BENCH_CITIES = MOROCCAN_CITIES
+
+# Nombres de villes comparées
+COMPARISON_SIZES = [3, 10, 32]
+
+# Tailles de collection par défaut (nombre total de relevés)
+DEFAULT_SIZES = [10000, 100000]
+
+# Intervalle (en minutes) entre deux relevés simulés d'une ville
+SEED_CADENCE = 10
+
+
+def seed(db: WeatherDB, readings_per_city: int):
+    """
+    Remplit la base avec un historique simulé (un relevé toutes les 10 minutes).
+    
+    Args:
+        db (WeatherDB): Base de données de benchmark
+        readings_per_city (int): Nombre de relevés par ville
+    """
+    seed_history(
+        db, BENCH_CITIES, days=readings_per_city * SEED_CADENCE / (24 * 60),
+        cadence_minutes=SEED_CADENCE, seed=0
+    )
+
+
+def write_pool(count: int) -> List[Dict]:
+    """
+    Prépare des documents neufs pour les benchmarks d'écriture
+    (un document inséré ne peut pas l'être une seconde fois).
+    
+    Args:
+        count (int): Nombre minimal de documents
+    
+    Returns:
+        List[Dict]: Documents simulés, toutes villes confondues
+    """
+    per_city = -(-count // len(BENCH_CITIES))  # Arrondi supérieur
+    batches = generate_history(
+        BENCH_CITIES, days=per_city * SEED_CADENCE / (24 * 60), cadence_minutes=SEED_CADENCE, seed=1
+    )
+    return list(chain.from_iterable(batches))
+
+
+class ErrorCounter(logging.Handler):
+    """
+    Compte les erreurs journalisées : les méthodes de WeatherDB interceptent
+    leurs propres exceptions et retournent [] ou None après un logger.error.
+    """
+    
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+    
+    def emit(self, record: logging.LogRecord):
+        self.count += 1
+
+
+def is_empty(result: object) -> bool:
+    """
+    Indique si une lecture n'a rien retourné (None, liste, dictionnaire ou DataFrame vide).
+    """
+    if result is None:
+        return True
+    if hasattr(result, "empty"):  # DataFrame
+        return result.empty
+    return hasattr(result, "__len__") and len(result) == 0
+
+
+def measure(func: Callable[[int], object], repeat: int, warmup: int = 0, allow_empty: bool = True) -> Dict:
+    """
+    Exécute une fonction plusieurs fois et résume les durées.
+    
+    Une exécution est en erreur si elle lève une exception, si elle journalise
+    une erreur ou, avec allow_empty=False, si son résultat est vide. Seules les
+    exécutions réussies entrent dans les percentiles.
+    
+    Args:
+        func (Callable[[int], object]): Fonction à mesurer (reçoit le numéro de l'exécution)
+        repeat (int): Nombre d'exécutions mesurées
+        warmup (int): Exécutions préalables non mesurées
+        allow_empty (bool): False pour les lectures, qui doivent retourner des données
+    
+    Returns:
+        Dict: Résumé des durées (voir summarize)
+    """
+    for i in range(warmup):
+        func(i)
+    
+    counter = ErrorCounter()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.addHandler(counter)
+    
+    durations = []
+    errors = 0
+    try:
+        for i in range(repeat):
+            logged = counter.count
+            start = time.perf_counter()
+            try:
+                result = func(warmup + i)
+            except Exception:
+                errors += 1
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            
+            if counter.count > logged or (not allow_empty and is_empty(result)):
+                errors += 1
+            else:
+                durations.append(elapsed)
+    finally:
+        root.removeHandler(counter)
+    
+    return summarize(durations, errors)
+
+
+def summarize(durations: List[float], errors: int = 0) -> Dict:
+    """
+    Résume une série de durées.
+    
+    Args:
+        durations (List[float]): Durées en millisecondes
+        errors (int): Nombre d'exécutions en erreur
+    
+    Returns:
+        Dict: Percentiles et moyenne en millisecondes, débit en opérations par seconde
+              et nombre d'exécutions en erreur
+    """
+    if not durations:  # Toutes les exécutions en erreur
+        nan = float("nan")
+        return {"p50_ms": nan, "p95_ms": nan, "p99_ms": nan, "mean_ms": nan, "ops_per_s": 0.0, "errors": errors}
+    
+    p50, p95, p99 = np.percentile(durations, [50, 95, 99]).tolist()
+    return {
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "mean_ms": round(sum(durations) / len(durations), 3),
+        "ops_per_s": round(1000 * len(durations) / sum(durations), 1),
+        "errors": errors
+    }
+
+
+def latest_one_by_one(db: WeatherDB, cities: List[str]) -> Dict[str, Dict]:
+    """
+    Ancienne implémentation de get_comparison_data : un find_one par ville.
+    """
+    result = {}
+    for city in cities:
+        data = db.get_latest_weather(city)
+        if data:
+            result[city] = data
+    return result
+
+
+def read_benchmarks() -> Dict[str, Callable[[WeatherDB, int], object]]:
+    """
+    Méthodes de lecture mesurées : nom -> fonction (base, numéro d'exécution).
+    Les villes varient d'une exécution à l'autre.
+    """
+    def city(i: int) -> str:
+        return BENCH_CITIES[i % len(BENCH_CITIES)]
+    
+    benchmarks = {
+        "get_latest_weather": lambda db, i: db.get_latest_weather(city(i)),
+        "get_historical_weather[24h]": lambda db, i: db.get_historical_weather(city(i), 24),
+        "get_historical_weather[7j,1h]": lambda db, i: db.get_historical_weather(city(i), 168, bucket="1h"),
+        "get_history_frame[24h]": lambda db, i: db.get_history_frame(city(i), 24),
+        "get_rollup_summary[24h]": lambda db, i: db.get_rollup_summary(city(i), 24),
+        "get_all_cities": lambda db, i: db.get_all_cities()
+    }
+    for size in COMPARISON_SIZES:
+        cities = BENCH_CITIES[:size]
+        benchmarks[f"get_comparison_data[{size}]"] = lambda db, i, cities=cities: db.get_comparison_data(cities)
+        benchmarks[f"find_one_loop[{size}]"] = lambda db, i, cities=cities: latest_one_by_one(db, cities)
+    return benchmarks
+
+
+def run_size(db: WeatherDB, size: int, repeat: int, warmup: int) -> List[Dict]:
+    """
+    Remplit la base avec `size` relevés puis mesure chaque méthode.
+    
+    Args:
+        db (WeatherDB): Base de données de benchmark (vidée au préalable)
+        size (int): Nombre total de relevés insérés
+        repeat (int): Exécutions mesurées par méthode
+        warmup (int): Exécutions préalables non mesurées
+    
+    Returns:
+        List[Dict]: Une ligne de résultats par méthode
+    """
+    print(f"\nInsertion de {size} relevés pour {len(BENCH_CITIES)} villes...")
+    started = time.perf_counter()
+    seed(db, size // len(BENCH_CITIES))
+    print(f"[OK] Base remplie en {time.perf_counter() - started:.1f} s")
+    
+    results = []
+    
+    # Lectures d'abord, pour qu'elles portent sur la taille annoncée
+    for name, func in read_benchmarks().items():
+        stats = measure(lambda i, func=func: func(db, i), repeat, warmup, allow_empty=False)
+        results.append({"size": size, "method": name, **stats})
+    
+    # Écritures : des documents neufs à chaque exécution
+    pool = iter(write_pool((repeat + warmup) * (len(BENCH_CITIES) + 1)))
+    stats = measure(lambda i: db.save_weather_data(next(pool)), repeat, warmup)
+    results.append({"size": size, "method": "save_weather_data", **stats})
+    
+    batch = len(BENCH_CITIES)
+    stats = measure(lambda i: db.save_many([next(pool) for _ in range(batch)]), repeat, warmup)
+    results.append({"size": size, "method": f"save_many[{batch}]", **stats})
+    
+    return results
+
+
+def print_results(results: List[Dict], baseline: Optional[Dict[tuple, Dict]] = None):
+    """
+    Affiche les résultats sous forme de tableau, avec l'écart de p50 par
+    rapport à une exécution de référence si elle est fournie.
+    """
+    header = f"{'Relevés':>8} | {'Méthode':<32} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'ops/s':>8}"
+    if baseline:
+        header += f" | {'Δ p50':>7}"
+    print("\n" + header)
+    print("-" * len(header))
+    
+    for row in results:
+        line = (
+            f"{row['size']:>8} | {row['method']:<32} | {row['p50_ms']:>8.2f} | "
+            f"{row['p95_ms']:>8.2f} | {row['p99_ms']:>8.2f} | {row['ops_per_s']:>8.1f}"
+        )
+        if baseline:
+            reference = baseline.get((row["size"], row["method"]))
+            if reference and reference["p50_ms"]:
+                line += f" | {100 * (row['p50_ms'] / reference['p50_ms'] - 1):>+6.0f}%"
+            else:
+                line += f" | {'-':>7}"
+        if row["errors"]:
+            line += f"  ({row['errors']} erreurs)"
+        print(line)
+
+
+def current_commit() -> Optional[str]:
+    """
+    Retourne le commit courant (pour identifier les résultats), ou None.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_baseline(path: str) -> Dict[tuple, Dict]:
+    """
+    Charge les résultats d'une exécution précédente, indexés par (taille, méthode).
+    """
+    with open(path, encoding="utf-8") as f:
+        content = json.load(f)
+    return {(row["size"], row["method"]): row for row in content["results"]}
+
+
+def create_client(backend: str):
+    """
+    Retourne le client à utiliser : None (MongoClient sur MONGO_URI) ou un
+    client mongomock en mémoire.
+    """
+    if backend == "mongo":
+        return None
+    
+    try:
+        import mongomock  # Dépendance facultative, uniquement pour ce benchmark
+    except ImportError:
+        raise SystemExit("[ERREUR] mongomock n'est pas installé (pip install mongomock)")
+    return mongomock.MongoClient()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des méthodes de WeatherDB")
+    parser.add_argument("--database", default="climatrack_bench", help="Base de données de benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Nombres total de relevés")
+    parser.add_argument("--repeat", type=int, default=50, help="Exécutions mesurées par méthode")
+    parser.add_argument("--warmup", type=int, default=3, help="Exécutions préalables non mesurées")
+    parser.add_argument("--backend", choices=["mongo", "mongomock"], default="mongo", help="Serveur MongoDB ou mongomock")
+    parser.add_argument("--cache", action="store_true", help="Activer le cache des lectures")
+    parser.add_argument("--latest-store", action="store_true", help="Activer la table des derniers relevés")
+    parser.add_argument("--json", help="Fichier où écrire les résultats")
+    parser.add_argument("--baseline", help="Résultats JSON de référence à comparer")
+    parser.add_argument("--keep", action="store_true", help="Conserver la base après le benchmark")
+    args = parser.parse_args()
+    
+    # Par défaut, cache et table des derniers relevés désactivés : mesurer les requêtes MongoDB elles-mêmes
+    db = WeatherDB(
+        database=args.database,
+        cache_size=None if args.cache else 0,
+        latest_store=args.latest_store,
+        client=create_client(args.backend)
+    )
+    if not db.connect():
+        raise SystemExit(1)
+    
+    results = []
+    try:
+        for size in sorted(args.sizes):
+            # Repartir d'une base vide (index et table des derniers relevés compris)
+            db.client.drop_database(args.database)
+            db.connect()
+            results.extend(run_size(db, size, args.repeat, args.warmup))
+    
+    finally:
+        if not args.keep:
+            db.client.drop_database(args.database)
+        db.close()
+    
+    print_results(results, load_baseline(args.baseline) if args.baseline else None)
+    
+    if args.json:
+        report = {
+            "meta": {
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "commit": current_commit(),
+                "backend": args.backend,
+                "storage_mode": db.storage_mode,
+                "repeat": args.repeat,
+                "cache": args.cache,
+                "latest_store": args.latest_store
+            },
+            "results": results
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] Résultats écrits dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,29 +6,412 @@ des données météorologiques en temps réel.
 """
 
 import os  # Pour accéder aux variables d'environnement
-from datetime import datetime, timedelta  # Pour gérer les dates et heures
+import functools  # Pour le décorateur de mise en cache
+import threading  # Pour protéger le cache partagé entre les threads
+import time  # Pour la durée de validité du cache
+from collections import OrderedDict  # Pour l'ordre LRU du cache
+from datetime import datetime, timedelta, timezone  # Pour gérer les dates et heures
+from itertools import islice  # Pour lire le curseur par lots
 from typing import List, Dict, Optional  # Pour le typage des fonctions
-from pymongo import MongoClient, DESCENDING  # Client MongoDB et constantes
+import numpy as np  # Colonnes préallouées de l'historique
+import pandas as pd  # DataFrame typé de l'historique
+from pymongo import MongoClient, ASCENDING, DESCENDING, IndexModel, UpdateOne  # Client MongoDB et constantes
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure, PyMongoError  # Erreurs MongoDB gérées
+from pymongo.write_concern import WriteConcern  # Niveau d'acquittement des écritures
+from bson import ObjectId  # Position du suivi des nouveaux relevés (ordre d'insertion)
 from dotenv import load_dotenv  # Pour charger les variables d'environnement
 
+from logging_config import get_logger  # Journalisation structurée
+from metrics import CACHE_REQUESTS, DB_LATENCY, DOCUMENTS_WRITTEN  # Métriques d'exécution
+
 # Charger les variables d'environnement depuis le fichier .env
 load_dotenv()
 
+# Journal du module (niveau réglable avec LOG_LEVELS=db=...)
+logger = get_logger("db")
+
+# Write concern des insertions groupées ("1", "majority", "0" pour ne pas attendre...)
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "1")
+
+# Cache des lectures du dashboard : nombre maximal d'entrées (0 = désactivé)
+# et durée de validité en secondes (par défaut: la cadence d'ingestion)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", os.getenv("INGESTION_INTERVAL", "60")))
+
+# Intervalle (en secondes) du suivi par requêtes lorsque les change streams
+# ne sont pas disponibles (serveur autonome, collection time-series)
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "2"))
+
+# Recouvrement (en secondes) entre deux requêtes du suivi : tolère les écarts
+# d'horloge entre les processus qui écrivent (les _id déjà transmis sont ignorés)
+LIVE_POLL_OVERLAP = 10
+
+# Nom de la base de données
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "climatrack")
+
+# Mode de stockage : "standard" (collection classique) ou "timeseries"
+# (collection time-series native, MongoDB 5.0+)
+MONGO_STORAGE_MODE = os.getenv("MONGO_STORAGE_MODE", "standard")
+
+# Granularité des buckets time-series ("seconds", "minutes" ou "hours")
+MONGO_TS_GRANULARITY = os.getenv("MONGO_TS_GRANULARITY", "minutes")
+
+# Noms des collections selon le mode de stockage
+REALTIME_COLLECTION = "weather_realtime"
+TIMESERIES_COLLECTION = "weather_timeseries"
+
+# Collection des états internes (point de reprise de la migration...)
+STATE_COLLECTION = "weather_state"
+
+# Identifiant du point de reprise de la migration vers la collection time-series
+MIGRATION_CHECKPOINT = "timeseries_migration"
+
+# Identifiant de l'état des collections pré-agrégées (couvrent-elles tous les relevés ?)
+ROLLUP_STATE = "rollups"
+
+# Index de la collection weather_realtime
+WEATHER_INDEXES = [
+    # Dernier relevé d'une ville, historique d'une ville, liste des villes (distinct)
+    IndexModel([("city", ASCENDING), ("timestamp", DESCENDING)], name="city_timestamp"),
+    # Requêtes par plage de dates toutes villes confondues
+    IndexModel([("timestamp", DESCENDING)], name="timestamp"),
+]
+
+# Intervalles d'agrégation de l'historique : nom -> (unité $dateTrunc, taille, durée en minutes)
+HISTORY_BUCKETS = {
+    "1min": ("minute", 1, 1),
+    "5min": ("minute", 5, 5),
+    "15min": ("minute", 15, 15),
+    "30min": ("minute", 30, 30),
+    "1h": ("hour", 1, 60),
+    "3h": ("hour", 3, 180),
+    "6h": ("hour", 6, 360),
+    "1d": ("day", 1, 1440),
+}
+
+# Nombre maximal de points par série lorsque l'intervalle est choisi automatiquement
+MAX_CHART_POINTS = int(os.getenv("MAX_CHART_POINTS", "300"))
+
+# Mesures numériques résumées (moyenne, min, max) dans chaque intervalle
+NUMERIC_FIELDS = ["temperature", "humidity", "pressure", "wind_speed"]
+
+# Collections pré-agrégées : granularité -> (collection, unité $dateTrunc)
+ROLLUPS = {
+    "hourly": ("weather_hourly", "hour"),
+    "daily": ("weather_daily", "day"),
+}
+
+# Index des collections pré-agrégées (un document par ville et par période)
+ROLLUP_INDEXES = [
+    IndexModel([("city", ASCENDING), ("period", ASCENDING)], name="city_period", unique=True),
+]
+
+
+def _truncate(timestamp: datetime, unit: str) -> datetime:
+    """
+    Ramène un horodatage au début de son heure ou de sa journée.
+    
+    Args:
+        timestamp (datetime): Horodatage d'un relevé
+        unit (str): "hour" ou "day"
+        
+    Returns:
+        datetime: Début de la période contenant l'horodatage
+    """
+    timestamp = timestamp.replace(minute=0, second=0, microsecond=0)
+    if unit == "day":
+        timestamp = timestamp.replace(hour=0)
+    return timestamp
+
+
+def select_bucket(hours: int) -> str:
+    """
+    Choisit le plus petit intervalle d'agrégation qui limite une fenêtre
+    de `hours` heures à MAX_CHART_POINTS points.
+    
+    Args:
+        hours (int): Durée de la fenêtre en heures
+        
+    Returns:
+        str: Nom de l'intervalle (clé de HISTORY_BUCKETS, ex: "5min")
+    """
+    for name, (_, _, minutes) in HISTORY_BUCKETS.items():
+        if hours * 60 / minutes <= MAX_CHART_POINTS:
+            return name
+    
+    # Fenêtre très longue : utiliser le plus grand intervalle disponible
+    return name
+
+
+def _parse_write_concern(value: str) -> WriteConcern:
+    """
+    Convertit une valeur de configuration ("1", "majority"...) en WriteConcern.
+    
+    Args:
+        value (str): Nombre de nœuds à attendre ou nom d'un mode (ex: "majority")
+        
+    Returns:
+        WriteConcern: Write concern utilisable avec with_options()
+    """
+    return WriteConcern(w=int(value) if value.isdigit() else value)
+
+# Colonnes de l'historique et leur type compact (moins de mémoire que des objets Python)
+HISTORY_COLUMNS = {
+    "timestamp": "datetime64[ms]",
+    "temperature": "float32",
+    "humidity": "float32",  # NaN si absente : ignorée par les moyennes pandas
+    "pressure": "float32",
+    "wind_speed": "float32",
+    "city": "category",
+    "weather": "category",
+    "description": "category",
+}
+
+# Valeur utilisée lorsqu'un champ numérique est absent d'un document (ou None)
+MISSING_VALUES = {"float32": np.nan, "datetime64[ms]": np.datetime64("NaT")}
+
+# Nombre de documents transférés par lot lors de la lecture de l'historique
+HISTORY_BATCH_SIZE = 1000
+
+
+class QueryCache:
+    """
+    Cache LRU borné des résultats de lecture, avec durée de validité.
+    
+    Un compteur de génération est incrémenté à chaque écriture : les entrées
+    d'une génération précédente sont ignorées, et un résultat lu avant une
+    écriture n'est jamais mis en cache après celle-ci.
+    """
+    
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Args:
+            max_size (int): Nombre maximal d'entrées (0 désactive le cache)
+            ttl (float): Durée de validité d'une entrée en secondes
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # clé -> (valeur, date d'insertion, génération)
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """
+        Cherche une entrée valide.
+        
+        Returns:
+            tuple: (trouvée, valeur)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at, generation = entry
+                if generation == self.generation and time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)  # Entrée la plus récemment utilisée
+                    self.hits += 1
+                    CACHE_REQUESTS.inc(cache="query", result="hit")
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache="query", result="miss")
+            return False, None
+    
+    def set(self, key, value, generation: int):
+        """
+        Enregistre un résultat lu pendant la génération `generation`.
+        Ignoré si une écriture a eu lieu depuis le début de la lecture.
+        """
+        with self._lock:
+            if self.max_size <= 0 or generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic(), generation)
+            self._entries.move_to_end(key)
+            
+            # Évincer les entrées les moins récemment utilisées
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self):
+        """
+        Invalide toutes les entrées (appelé après chaque écriture).
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+class LatestStore:
+    """
+    Table en mémoire du dernier relevé de chaque ville.
+    Les lectures sont des accès dictionnaire O(1), sans aller-retour réseau.
+    """
+    
+    def __init__(self):
+        self._latest: Dict[str, Dict] = {}  # ville -> dernier relevé
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._latest)
+    
+    def get(self, city: str) -> Optional[Dict]:
+        """
+        Retourne le dernier relevé connu d'une ville, ou None.
+        """
+        return self._latest.get(city)
+    
+    def get_many(self, cities: List[str]) -> Dict[str, Dict]:
+        """
+        Retourne les derniers relevés connus, dans l'ordre de `cities`
+        (villes inconnues omises).
+        """
+        latest = self._latest
+        return {city: latest[city] for city in cities if city in latest}
+    
+    def update(self, docs: List[Dict]):
+        """
+        Intègre de nouveaux relevés : seul le plus récent de chaque ville est conservé.
+        """
+        with self._lock:
+            for doc in docs:
+                current = self._latest.get(doc["city"])
+                if current is None or doc["timestamp"] >= current["timestamp"]:
+                    self._latest[doc["city"]] = doc
+    
+    def replace(self, docs: List[Dict]):
+        """
+        Remplace tout le contenu de la table (reconstruction).
+        """
+        with self._lock:
+            self._latest = {doc["city"]: doc for doc in docs}
+
+
+def _cached(method):
+    """
+    Décorateur des méthodes de lecture de WeatherDB : le résultat est servi
+    depuis le cache tant qu'il est valide, clé = (méthode, arguments).
+    Les objets renvoyés sont partagés et ne doivent pas être modifiés.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        # Les listes (ex: villes comparées) ne sont pas hachables
+        freeze = lambda value: tuple(value) if isinstance(value, list) else value
+        key = (
+            method.__name__,
+            tuple(freeze(arg) for arg in args),
+            tuple(sorted((name, freeze(value)) for name, value in kwargs.items()))
+        )
+        found, value = self.cache.get(key)
+        if found:
+            return value
+        
+        generation = self.cache.generation
+        value = method(self, *args, **kwargs)
+        self.cache.set(key, value, generation)
+        return value
+    
+    return wrapper
+
+
+def _timed(method):
+    """
+    Décorateur des méthodes de WeatherDB : la durée de chaque appel (cache
+    compris) est enregistrée dans l'histogramme climatrack_db_operation_seconds.
+    """
+    name = method.__name__
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            DB_LATENCY.observe(time.perf_counter() - start, method=name)
+    
+    return wrapper
+
+
+def _summarize_plan(explain: Dict) -> Dict:
+    """
+    Résume la sortie d'explain() : étapes du plan gagnant et index utilisés.
+    
+    Args:
+        explain (Dict): Résultat brut d'explain()
+        
+    Returns:
+        Dict: {"stages": ["LIMIT", "FETCH", "IXSCAN"], "indexes": ["city_timestamp"]}
+    """
+    stages, indexes = [], []
+    
+    # Parcourir l'arbre du plan gagnant (inputStage / inputStages)
+    pending = [explain.get("queryPlanner", {}).get("winningPlan", {})]
+    while pending:
+        stage = pending.pop(0)
+        # Les serveurs récents enveloppent le plan dans "queryPlan"
+        stage = stage.get("queryPlan", stage)
+        if "stage" in stage:
+            stages.append(stage["stage"])
+        if "indexName" in stage:
+            indexes.append(stage["indexName"])
+        if "inputStage" in stage:
+            pending.append(stage["inputStage"])
+        pending.extend(stage.get("inputStages", []))
+    
+    return {"stages": stages, "indexes": indexes}
+
+
 class WeatherDB:
     """
     Gestionnaire de base de données MongoDB pour les données météorologiques.
     Fournit des méthodes pour sauvegarder et récupérer les données météo.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        storage_mode: Optional[str] = None,
+        database: Optional[str] = None,
+        cache_size: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        latest_store: bool = True,
+        client=None
+    ):
         """
         Initialise la connexion à MongoDB.
         Configure l'URI de connexion depuis les variables d'environnement.
+        
+        Args:
+            storage_mode (Optional[str]): "standard" ou "timeseries"
+                                          (par défaut: MONGO_STORAGE_MODE)
+            database (Optional[str]): Nom de la base de données (par défaut: MONGO_DB_NAME)
+            cache_size (Optional[int]): Entrées du cache de lecture, 0 pour le désactiver
+                                        (par défaut: QUERY_CACHE_SIZE)
+            cache_ttl (Optional[float]): Validité du cache en secondes (par défaut: QUERY_CACHE_TTL)
+            latest_store (bool): Si True, garde en mémoire le dernier relevé de chaque ville
+            client: Client déjà construit, compatible MongoClient (ex: mongomock pour les
+                    benchmarks sans serveur) ; par défaut un MongoClient sur MONGO_URI
         """
         # Récupérer l'URI MongoDB depuis .env (par défaut: localhost)
         self.mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
         
+        # Type de collection utilisée pour les relevés
+        self.storage_mode = storage_mode or MONGO_STORAGE_MODE
+        
+        # Nom de la base de données utilisée
+        self.database_name = database or MONGO_DB_NAME
+        
+        # Cache des lectures, invalidé à chaque écriture
+        self.cache = QueryCache(
+            QUERY_CACHE_SIZE if cache_size is None else cache_size,
+            QUERY_CACHE_TTL if cache_ttl is None else cache_ttl
+        )
+        
+        # Derniers relevés par ville, chargés à la connexion puis tenus à jour
+        # par les écritures (et par live.LiveFeed pour celles des autres processus)
+        self.latest = LatestStore() if latest_store else None
+        
         # Initialiser les variables de connexion
+        self._provided_client = client  # Client fourni par l'appelant
         self.client = None  # Client MongoDB
         self.db = None  # Base de données
         self.collection = None  # Collection pour les données météo
@@ -36,32 +419,233 @@ class WeatherDB:
     def connect(self):
         """
         Établit la connexion à MongoDB.
-        Crée la base de données 'climatrack' et la collection 'weather_realtime'.
+        Crée la base de données 'climatrack' et la collection 'weather_realtime'
+        (ou 'weather_timeseries' en mode time-series).
         
         Returns:
             bool: True si la connexion réussit, False sinon
         """
         try:
-            # Créer le client MongoDB avec l'URI de connexion
-            self.client = MongoClient(self.mongo_uri)
+            # Créer le client MongoDB avec l'URI de connexion (sauf client fourni) ;
+            # une reconnexion réutilise le client existant au lieu d'en ouvrir un autre
+            self.client = self._provided_client or self.client or MongoClient(self.mongo_uri)
             
-            # Sélectionner la base de données 'climatrack'
-            self.db = self.client["climatrack"]
+            # Sélectionner la base de données ('climatrack' par défaut)
+            self.db = self.client[self.database_name]
             
-            # Sélectionner la collection 'weather_realtime'
-            self.collection = self.db["weather_realtime"]
+            # Sélectionner la collection des relevés selon le mode de stockage
+            if self.storage_mode == "timeseries":
+                self.collection = self._ensure_timeseries_collection()
+            else:
+                self.collection = self.db[REALTIME_COLLECTION]
             
             # Tester la connexion avec une commande ping
             self.client.admin.command('ping')
             
-            print("[OK] Connexion MongoDB réussie")
+            logger.info("Connexion MongoDB réussie", extra={"database": self.database_name, "storage": self.storage_mode})
+            
+            # Créer les index manquants (sans effet s'ils existent déjà)
+            self.ensure_indexes()
+            
+            # Charger le dernier relevé de chaque ville en mémoire
+            self.rebuild_latest()
             return True
             
         except Exception as e:
             # Afficher l'erreur si la connexion échoue
-            print(f"[ERREUR] Échec de connexion MongoDB: {e}")
+            logger.error("Échec de connexion MongoDB", extra={"database": self.database_name, "error": str(e)})
             return False
     
+    def _ensure_timeseries_collection(self):
+        """
+        Crée la collection time-series si elle n'existe pas encore.
+        'timestamp' est le champ temporel et 'city' la métadonnée : MongoDB
+        regroupe les relevés d'une même ville dans des buckets compressés.
+        
+        Returns:
+            Collection: Collection time-series des relevés
+        """
+        if not self.db.list_collection_names(filter={"name": TIMESERIES_COLLECTION}):
+            try:
+                self.db.create_collection(
+                    TIMESERIES_COLLECTION,
+                    timeseries={
+                        "timeField": "timestamp",
+                        "metaField": "city",
+                        "granularity": MONGO_TS_GRANULARITY
+                    }
+                )
+                logger.info("Collection time-series créée", extra={"collection": TIMESERIES_COLLECTION})
+            except CollectionInvalid:
+                # Créée entre-temps par un autre processus
+                pass
+        
+        return self.db[TIMESERIES_COLLECTION]
+    
+    def migrate_to_timeseries(self, batch_size: int = 5000) -> int:
+        """
+        Copie les relevés de la collection classique vers la collection
+        time-series, par lots, dans l'ordre (timestamp, _id). La migration peut
+        être relancée : elle reprend après le dernier relevé copié, enregistré
+        dans STATE_COLLECTION après chaque lot. Les relevés écrits directement
+        dans la cible (ingestion déjà en mode time-series) n'interviennent pas.
+        
+        Args:
+            batch_size (int): Nombre de documents copiés par insertion
+            
+        Returns:
+            int: Nombre de documents copiés
+        """
+        source = self.db[REALTIME_COLLECTION]
+        target = self._ensure_timeseries_collection()
+        
+        # Reprendre après le dernier relevé copié (plusieurs villes partagent un
+        # même timestamp : le point de reprise porte aussi sur _id)
+        checkpoint = self.db[STATE_COLLECTION].find_one({"_id": MIGRATION_CHECKPOINT})
+        query = {}
+        if checkpoint:
+            query = {"$or": [
+                {"timestamp": {"$gt": checkpoint["timestamp"]}},
+                {"timestamp": checkpoint["timestamp"], "_id": {"$gt": checkpoint["last_id"]}}
+            ]}
+        
+        # Le tri porte sur toute la collection source : autoriser le disque
+        # au-delà de la limite mémoire de MongoDB (100 Mo)
+        cursor = source.find(query, allow_disk_use=True).sort([("timestamp", 1), ("_id", 1)]).batch_size(batch_size)
+        
+        copied = 0
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                copied += self._copy_batch(target, batch)
+                batch = []
+                logger.info("Lot copié", extra={"collection": TIMESERIES_COLLECTION, "copied": copied})
+        
+        # Copier le dernier lot incomplet
+        if batch:
+            copied += self._copy_batch(target, batch)
+        
+        logger.info("Migration terminée", extra={"collection": TIMESERIES_COLLECTION, "copied": copied})
+        self.cache.invalidate()
+        return copied
+    
+    def _copy_batch(self, target, batch: List[Dict]) -> int:
+        """
+        Copie un lot de la migration puis avance le point de reprise. Les
+        documents déjà présents dans la cible (lot copié par une exécution
+        interrompue avant l'enregistrement du point de reprise) sont ignorés.
+        
+        Args:
+            target: Collection time-series
+            batch (List[Dict]): Documents triés par (timestamp, _id)
+        
+        Returns:
+            int: Nombre de documents insérés
+        """
+        last = batch[-1]
+        present = set(target.distinct("_id", {
+            "timestamp": {"$gte": batch[0]["timestamp"], "$lte": last["timestamp"]},
+            "_id": {"$in": [doc["_id"] for doc in batch]}
+        }))
+        batch = [doc for doc in batch if doc["_id"] not in present]
+        
+        inserted = self._insert_batch(target, batch) if batch else 0
+        self.db[STATE_COLLECTION].update_one(
+            {"_id": MIGRATION_CHECKPOINT},
+            {"$set": {"timestamp": last["timestamp"], "last_id": last["_id"]}},
+            upsert=True
+        )
+        return inserted
+    
+    def _insert_batch(self, target, batch: List[Dict]) -> int:
+        """
+        Insère un lot de la migration ; les documents en erreur sont journalisés
+        sans interrompre la migration.
+        
+        Returns:
+            int: Nombre de documents insérés
+        """
+        try:
+            target.insert_many(batch, ordered=False)
+            return len(batch)
+        except BulkWriteError as e:
+            logger.error(
+                "Documents non copiés",
+                extra={
+                    "collection": TIMESERIES_COLLECTION,
+                    "failed": len(e.details.get("writeErrors", [])),
+                    "documents": len(batch)
+                }
+            )
+            return e.details.get("nInserted", 0)
+    
+    def ensure_indexes(self) -> bool:
+        """
+        Crée les index déclarés dans WEATHER_INDEXES (et ROLLUP_INDEXES pour
+        les collections pré-agrégées) s'ils n'existent pas.
+        Sans ces index, chaque lecture parcourt toute la collection.
+        
+        Returns:
+            bool: True si les index sont en place, False sinon
+        """
+        try:
+            self.collection.create_indexes(WEATHER_INDEXES)
+            for collection_name, _ in ROLLUPS.values():
+                self.db[collection_name].create_indexes(ROLLUP_INDEXES)
+            return True
+            
+        except Exception as e:
+            logger.error("Échec de création des index", extra={"error": str(e)})
+            return False
+    
+    def index_report(self, city: Optional[str] = None) -> Dict:
+        """
+        Rapport d'utilisation des index : statistiques $indexStats et plans
+        d'exécution (explain) des requêtes utilisées par le dashboard.
+        
+        Args:
+            city (Optional[str]): Ville utilisée pour les requêtes expliquées
+                                  (par défaut: une ville présente en base)
+            
+        Returns:
+            Dict: {"index_stats": [...], "plans": {requête: résumé du plan}}
+        """
+        # Nombre d'utilisations de chaque index depuis le démarrage du serveur
+        index_stats = [
+            {
+                "name": stat["name"],
+                "key": stat["key"],
+                "ops": stat["accesses"]["ops"],
+                "since": stat["accesses"]["since"]
+            }
+            for stat in self.collection.aggregate([{"$indexStats": {}}])
+        ]
+        
+        if city is None:
+            sample = self.collection.find_one({}, {"city": 1})
+            city = sample["city"] if sample else ""
+        
+        start_time = datetime.now() - timedelta(hours=24)
+        
+        # Plans d'exécution des requêtes de get_latest_weather, get_historical_weather et get_all_cities
+        plans = {
+            "get_latest_weather": self.collection.find({"city": city})
+                .sort("timestamp", DESCENDING).limit(1).explain(),
+            "get_historical_weather": self.collection.find(
+                {"city": city, "timestamp": {"$gte": start_time}}
+            ).sort("timestamp", 1).explain(),
+            "get_all_cities": self.db.command(
+                "explain", {"distinct": self.collection.name, "key": "city"}
+            ),
+        }
+        
+        return {
+            "index_stats": index_stats,
+            "plans": {name: _summarize_plan(plan) for name, plan in plans.items()}
+        }
+    
+    @_timed
     def save_weather_data(self, data: Dict) -> bool:
         """
         Sauvegarde les données météo dans MongoDB.
@@ -81,18 +665,422 @@ class WeatherDB:
             
             # Insérer le document dans la collection
             self.collection.insert_one(data)
+            DOCUMENTS_WRITTEN.inc(method="save_weather_data")
+            self.cache.invalidate()
+            self._remember_latest([data])
+            
+            # Mettre à jour les statistiques horaires et journalières
+            self.update_rollups([data])
             
             return True
             
         except Exception as e:
-            # Afficher l'erreur en cas d'échec
-            print(f"Erreur de sauvegarde des données: {e}")
+            # Journaliser l'erreur en cas d'échec
+            logger.error("Erreur de sauvegarde des données", extra={"city": data.get("city"), "error": str(e)})
             return False
     
+    @_timed
+    def save_many(self, docs: List[Dict], write_concern: Optional[str] = None, rollups: bool = True) -> Dict:
+        """
+        Sauvegarde plusieurs relevés en un seul aller-retour vers MongoDB.
+        L'insertion est non ordonnée : un document en erreur n'empêche pas
+        l'insertion des autres.
+        
+        Args:
+            docs (List[Dict]): Documents météo à insérer (un par ville en général)
+            write_concern (Optional[str]): Write concern à utiliser
+                                           (par défaut: MONGO_WRITE_CONCERN)
+            rollups (bool): Mettre à jour les collections pré-agrégées ; les
+                            chargements en masse passent False puis appellent
+                            rebuild_rollups() une seule fois
+            
+        Returns:
+            Dict: Nombre de documents insérés et erreurs par document
+                  Exemple: {"inserted": 31, "errors": [{"index": 4, "city": "Safi", "message": "..."}]}
+        """
+        if not docs:
+            return {"inserted": 0, "errors": []}
+        
+        # Ajouter un timestamp aux documents qui n'en ont pas
+        for doc in docs:
+            doc.setdefault("timestamp", datetime.now())
+        
+        # Statistiques non tenues à jour : résumés depuis les relevés bruts jusqu'à rebuild_rollups()
+        if not rollups:
+            self._set_rollups_complete(False)
+        
+        collection = self.collection.with_options(
+            write_concern=_parse_write_concern(write_concern or MONGO_WRITE_CONCERN)
+        )
+        
+        try:
+            # Insertion groupée non ordonnée (un seul aller-retour)
+            collection.insert_many(docs, ordered=False)
+            DOCUMENTS_WRITTEN.inc(len(docs), method="save_many")
+            self.cache.invalidate()
+            
+            # Mettre à jour les statistiques et les derniers relevés
+            if rollups:
+                self.update_rollups(docs)
+            self._remember_latest(docs)
+            return {"inserted": len(docs), "errors": []}
+            
+        except BulkWriteError as e:
+            # Certains documents ont échoué : détailler les erreurs par document
+            errors = [
+                {
+                    "index": error["index"],
+                    "city": docs[error["index"]].get("city"),
+                    "message": error.get("errmsg", "")
+                }
+                for error in e.details.get("writeErrors", [])
+            ]
+            logger.error(
+                "Documents non sauvegardés", extra={"failed": len(errors), "documents": len(docs)}
+            )
+            DOCUMENTS_WRITTEN.inc(e.details.get("nInserted", 0), method="save_many")
+            self.cache.invalidate()
+            
+            # Ne compter dans les statistiques que les documents insérés
+            failed = {error["index"] for error in errors}
+            inserted = [doc for i, doc in enumerate(docs) if i not in failed]
+            if rollups:
+                self.update_rollups(inserted)
+            self._remember_latest(inserted)
+            return {"inserted": e.details.get("nInserted", 0), "errors": errors}
+            
+        except Exception as e:
+            # Échec global (connexion perdue, etc.) : aucun document inséré
+            logger.error("Échec de la sauvegarde groupée", extra={"documents": len(docs), "error": str(e)})
+            return {
+                "inserted": 0,
+                "errors": [
+                    {"index": i, "city": doc.get("city"), "message": str(e)}
+                    for i, doc in enumerate(docs)
+                ]
+            }
+    
+    @_timed
+    def update_rollups(self, docs: List[Dict]):
+        """
+        Met à jour les collections pré-agrégées (weather_hourly, weather_daily)
+        avec de nouveaux relevés. Chaque document de ces collections contient,
+        pour une ville et une période : le nombre de relevés (count), le nombre
+        de valeurs renseignées (temperature_n...), la somme (temperature_sum...),
+        le minimum (temperature_min...) et le maximum (temperature_max...) de
+        chaque mesure.
+        
+        Les relevés d'une même ville et période sont d'abord combinés avec un
+        groupby pandas (vectorisé), puis appliqués par upserts $inc/$min/$max
+        en une écriture par collection : le coût dépend du nombre de périodes
+        touchées plus que du nombre de relevés.
+        
+        Args:
+            docs (List[Dict]): Relevés effectivement insérés
+        """
+        if not docs:
+            return
+        
+        frame = pd.DataFrame(docs, columns=["city", "timestamp", *NUMERIC_FIELDS])
+        frame[NUMERIC_FIELDS] = frame[NUMERIC_FIELDS].astype("float64")  # None -> NaN
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+        
+        aggregations = {"count": ("city", "size")}
+        for field in NUMERIC_FIELDS:
+            aggregations[f"{field}_n"] = (field, "count")  # Valeurs renseignées
+            aggregations[f"{field}_sum"] = (field, "sum")
+            aggregations[f"{field}_min"] = (field, "min")
+            aggregations[f"{field}_max"] = (field, "max")
+        
+        for collection_name, unit in ROLLUPS.values():
+            # Combiner les relevés par (ville, début de période)
+            period = frame["timestamp"].dt.floor("h" if unit == "hour" else "D").rename("period")
+            grouped = frame.groupby(["city", period]).agg(**aggregations)
+            
+            operations = []
+            for (city, start), row in zip(grouped.index, grouped.to_dict("records")):
+                update = {"$inc": {"count": int(row["count"])}, "$min": {}, "$max": {}}
+                for field in NUMERIC_FIELDS:
+                    # Mesure absente de tous les relevés de la période
+                    if not row[f"{field}_n"]:
+                        continue
+                    update["$inc"][f"{field}_n"] = int(row[f"{field}_n"])
+                    update["$inc"][f"{field}_sum"] = float(row[f"{field}_sum"])
+                    update["$min"][f"{field}_min"] = float(row[f"{field}_min"])
+                    update["$max"][f"{field}_max"] = float(row[f"{field}_max"])
+                update = {operator: values for operator, values in update.items() if values}
+                operations.append(UpdateOne({"city": city, "period": start.to_pydatetime()}, update, upsert=True))
+            
+            try:
+                self.db[collection_name].bulk_write(operations, ordered=False)
+            except Exception as e:
+                logger.error(
+                    "Échec de mise à jour des statistiques", extra={"collection": collection_name, "error": str(e)}
+                )
+                self._set_rollups_complete(False)
+    
+    def rebuild_rollups(self) -> Dict[str, int]:
+        """
+        Recalcule entièrement les collections pré-agrégées à partir des relevés
+        bruts (utile pour les données insérées avant leur création).
+        L'agrégation est exécutée par MongoDB et écrite avec $merge ; si elle
+        réussit pour toutes les collections, les statistiques sont de nouveau
+        considérées comme complètes (voir rollups_complete).
+        
+        Returns:
+            Dict[str, int]: Nombre de documents par collection pré-agrégée
+                            (collections en échec omises)
+        """
+        counts = {}
+        for collection_name, unit in ROLLUPS.values():
+            group = {
+                "_id": {
+                    "city": "$city",
+                    "period": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}
+                },
+                "count": {"$sum": 1}
+            }
+            for field in NUMERIC_FIELDS:
+                group[f"{field}_n"] = {"$sum": {"$cond": [{"$isNumber": f"${field}"}, 1, 0]}}
+                group[f"{field}_sum"] = {"$sum": f"${field}"}
+                group[f"{field}_min"] = {"$min": f"${field}"}
+                group[f"{field}_max"] = {"$max": f"${field}"}
+            
+            try:
+                self.collection.aggregate([
+                    {"$group": group},
+                    {"$addFields": {"city": "$_id.city", "period": "$_id.period"}},
+                    {"$project": {"_id": 0}},
+                    {"$merge": {
+                        "into": collection_name,
+                        "on": ["city", "period"],
+                        "whenMatched": "replace",
+                        "whenNotMatched": "insert"
+                    }}
+                ])
+            except Exception as e:
+                logger.error(
+                    "Échec du recalcul des statistiques", extra={"collection": collection_name, "error": str(e)}
+                )
+                continue
+            counts[collection_name] = self.db[collection_name].count_documents({})
+            logger.info(
+                "Statistiques recalculées", extra={"collection": collection_name, "documents": counts[collection_name]}
+            )
+        
+        if len(counts) == len(ROLLUPS):
+            self._set_rollups_complete(True)
+        self.cache.invalidate()
+        return counts
+    
+    def rollups_complete(self) -> bool:
+        """
+        Indique si les collections pré-agrégées couvrent tous les relevés.
+        L'état est enregistré dans STATE_COLLECTION : il devient faux après
+        une écriture sans mise à jour des statistiques (save_many(rollups=False))
+        ou un échec de mise à jour, et redevient vrai après rebuild_rollups.
+        
+        Returns:
+            bool: True si les statistiques sont complètes
+        """
+        state = self.db[STATE_COLLECTION].find_one({"_id": ROLLUP_STATE})
+        if state is None:
+            # Première utilisation : complètes seulement si aucun relevé n'existe encore
+            complete = self.collection.find_one({}, {"_id": 1}) is None
+            self._set_rollups_complete(complete)
+            return complete
+        return bool(state.get("complete"))
+    
+    def _set_rollups_complete(self, complete: bool):
+        """
+        Enregistre l'état des collections pré-agrégées (voir rollups_complete).
+        """
+        try:
+            self.db[STATE_COLLECTION].update_one(
+                {"_id": ROLLUP_STATE}, {"$set": {"complete": complete, "updated_at": datetime.now()}}, upsert=True
+            )
+        except Exception as e:
+            logger.error("Échec d'enregistrement de l'état des statistiques", extra={"error": str(e)})
+    
+    @_timed
+    @_cached
+    def get_rollups(self, city: str, granularity: str = "hourly", hours: int = 24) -> List[Dict]:
+        """
+        Récupère les statistiques pré-agrégées d'une ville sur une période.
+        Adapté aux graphiques longue durée (un point par heure ou par jour).
+        
+        Args:
+            city (str): Nom de la ville
+            granularity (str): "hourly" ou "daily"
+            hours (int): Nombre d'heures à récupérer (par défaut: 24h)
+            
+        Returns:
+            List[Dict]: Un document par période, trié par date croissante, avec
+                        la moyenne de chaque mesure (temperature, humidity...)
+        """
+        try:
+            collection_name, unit = ROLLUPS[granularity]
+            start = _truncate(datetime.now() - timedelta(hours=hours), unit)
+            
+            results = list(
+                self.db[collection_name]
+                .find({"city": city, "period": {"$gte": start}}, {"_id": 0})
+                .sort("period", 1)
+            )
+            
+            # Calculer la moyenne de chaque mesure à partir de la somme des
+            # valeurs renseignées (count pour les documents antérieurs à {field}_n)
+            for doc in results:
+                for field in NUMERIC_FIELDS:
+                    count = doc.get(f"{field}_n", doc["count"])
+                    if f"{field}_sum" in doc and count:
+                        doc[field] = doc[f"{field}_sum"] / count
+            return results
+            
+        except Exception as e:
+            logger.error("Erreur de récupération des statistiques", extra={"city": city, "error": str(e)})
+            return []
+    
+    @_timed
+    @_cached
+    def get_rollup_summary(self, city: str, hours: int = 24) -> Optional[Dict]:
+        """
+        Résume exactement les `hours` dernières heures : température maximale,
+        minimale et moyenne, et nombre de relevés. Les heures complètes sont
+        lues dans les statistiques horaires, l'heure entamée au début de la
+        période dans les relevés bruts. Si les statistiques ne couvrent pas
+        tous les relevés (voir rollups_complete), tout est calculé depuis les
+        relevés bruts.
+        
+        Args:
+            city (str): Nom de la ville
+            hours (int): Nombre d'heures couvertes (par défaut: 24h)
+            
+        Returns:
+            Optional[Dict]: {"temperature_max", "temperature_min", "temperature_mean", "count"}
+                            ou None si aucun relevé n'existe
+        """
+        try:
+            collection_name, unit = ROLLUPS["hourly"]
+            start = datetime.now() - timedelta(hours=hours)
+            first_hour = _truncate(start, unit)
+            if first_hour < start:
+                first_hour += timedelta(hours=1)
+            
+            pipeline = [
+                {"$match": {"city": city, "period": {"$gte": first_hour}}},
+                {"$group": {
+                    "_id": None,
+                    "temperature_max": {"$max": "$temperature_max"},
+                    "temperature_min": {"$min": "$temperature_min"},
+                    "temperature_sum": {"$sum": "$temperature_sum"},
+                    "temperature_n": {"$sum": {"$ifNull": ["$temperature_n", "$count"]}},
+                    "count": {"$sum": "$count"}
+                }}
+            ]
+            
+            # Statistiques incomplètes : tout recalculer depuis les relevés bruts
+            if self.rollups_complete():
+                hourly = next(self.db[collection_name].aggregate(pipeline), None)
+                parts = [hourly, self._raw_summary(city, start, first_hour)]
+            else:
+                parts = [self._raw_summary(city, start)]
+            
+            # Moyenne, minimum et maximum sur les températures renseignées uniquement
+            parts = [part for part in parts if part and part["temperature_n"]]
+            if not parts:
+                return None
+            
+            return {
+                "temperature_max": max(part["temperature_max"] for part in parts),
+                "temperature_min": min(part["temperature_min"] for part in parts),
+                "temperature_mean": (
+                    sum(part["temperature_sum"] for part in parts) / sum(part["temperature_n"] for part in parts)
+                ),
+                "count": sum(part["count"] for part in parts)
+            }
+            
+        except Exception as e:
+            logger.error("Erreur de récupération du résumé", extra={"city": city, "error": str(e)})
+            return None
+    
+    def _raw_summary(self, city: str, start: datetime, end: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        Maximum, minimum, somme et nombre des températures renseignées, et
+        nombre de relevés bruts d'une ville entre `start` (inclus) et `end` (exclu, par défaut: maintenant).
+        """
+        period = {"$gte": start}
+        if end is not None:
+            period["$lt"] = end
+        
+        pipeline = [
+            {"$match": {"city": city, "timestamp": period}},
+            {"$group": {
+                "_id": None,
+                "temperature_max": {"$max": "$temperature"},
+                "temperature_min": {"$min": "$temperature"},
+                "temperature_sum": {"$sum": "$temperature"},
+                "temperature_n": {"$sum": {"$cond": [{"$isNumber": "$temperature"}, 1, 0]}},
+                "count": {"$sum": 1}
+            }}
+        ]
+        return next(self.collection.aggregate(pipeline), None)
+    
+    def _remember_latest(self, docs: List[Dict]):
+        """
+        Met à jour la table des derniers relevés après une écriture.
+        """
+        if self.latest is not None:
+            self.latest.update(docs)
+    
+    def rebuild_latest(self) -> int:
+        """
+        Recharge la table des derniers relevés depuis MongoDB en une seule
+        agrégation (au démarrage, ou après un redémarrage du processus).
+        
+        Returns:
+            int: Nombre de villes chargées
+        """
+        if self.latest is None:
+            return 0
+        
+        try:
+            self.latest.replace(self._aggregate_latest())
+            return len(self.latest)
+            
+        except Exception as e:
+            logger.error("Échec du chargement des derniers relevés", extra={"error": str(e)})
+            return 0
+    
+    def _aggregate_latest(self, cities: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Dernier relevé de chaque ville en une seule agrégation : l'index
+        (city, timestamp) fournit les documents déjà triés et $first garde
+        le plus récent.
+        
+        Args:
+            cities (Optional[List[str]]): Villes voulues (par défaut: toutes)
+            
+        Returns:
+            List[Dict]: Un document par ville ayant des données
+        """
+        pipeline = [
+            {"$sort": {"city": 1, "timestamp": -1}},  # Plus récent en premier pour chaque ville
+            {"$group": {"_id": "$city", "doc": {"$first": "$$ROOT"}}},  # Un document par ville
+            {"$replaceRoot": {"newRoot": "$doc"}}  # Retrouver la forme du document d'origine
+        ]
+        if cities is not None:
+            pipeline.insert(0, {"$match": {"city": {"$in": cities}}})  # Filtre: villes demandées
+        
+        return list(self.collection.aggregate(pipeline))
+    
+    @_timed
     def get_latest_weather(self, city: str) -> Optional[Dict]:
         """
         Récupère les données météo les plus récentes pour une ville.
         Utile pour afficher la météo actuelle.
+        Servi depuis la table en mémoire ; MongoDB n'est interrogé que pour
+        une ville encore inconnue.
         
         Args:
             city (str): Nom de la ville (ex: "Casablanca")
@@ -100,6 +1088,13 @@ class WeatherDB:
         Returns:
             Optional[Dict]: Dictionnaire avec les données météo ou None si aucune donnée
         """
+        # Lecture en mémoire (O(1), sans requête réseau)
+        if self.latest is not None:
+            result = self.latest.get(city)
+            CACHE_REQUESTS.inc(cache="latest", result="miss" if result is None else "hit")
+            if result is not None:
+                return result
+        
         try:
             # Rechercher le document le plus récent pour cette ville
             # find_one() retourne un seul document
@@ -109,24 +1104,37 @@ class WeatherDB:
                 sort=[("timestamp", DESCENDING)]  # Trier par date décroissante
             )
             
+            if result is not None:
+                self._remember_latest([result])
             return result
             
         except Exception as e:
-            print(f"[ERREUR] Erreur de récupération des données: {e}")
+            logger.error("Erreur de récupération des données", extra={"city": city, "error": str(e)})
             return None
     
+    @_timed
+    @_cached
     def get_historical_weather(
         self, 
         city: str, 
-        hours: int = 24
+        hours: int = 24,
+        bucket: Optional[str] = None
     ) -> List[Dict]:
         """
         Récupère l'historique météo pour une ville sur une période donnée.
         Utilisé pour afficher les graphiques d'évolution temporelle.
         
+        Avec `bucket`, les relevés sont agrégés côté serveur par intervalle :
+        chaque point contient la moyenne (temperature, humidity...), le minimum
+        (temperature_min...) et le maximum (temperature_max...) de l'intervalle,
+        ainsi que le nombre de relevés (count).
+        
         Args:
             city (str): Nom de la ville
             hours (int): Nombre d'heures à récupérer (par défaut: 24h)
+            bucket (Optional[str]): Intervalle d'agrégation ("5min", "1h"...),
+                                    "auto" pour le choisir selon `hours`,
+                                    ou None pour les relevés bruts
             
         Returns:
             List[Dict]: Liste des documents météo triés par date croissante
@@ -135,6 +1143,12 @@ class WeatherDB:
             # Calculer la date de début (maintenant - X heures)
             start_time = datetime.now() - timedelta(hours=hours)
             
+            # Historique agrégé par intervalle
+            if bucket is not None:
+                if bucket == "auto":
+                    bucket = select_bucket(hours)
+                return self._aggregate_history(city, start_time, bucket)
+            
             # Rechercher tous les documents correspondants
             # find() retourne un curseur (itérateur) de documents
             results = self.collection.find(
@@ -148,9 +1162,150 @@ class WeatherDB:
             return list(results)
             
         except Exception as e:
-            print(f"[ERREUR] Erreur de récupération de l'historique: {e}")
+            logger.error("Erreur de récupération de l'historique", extra={"city": city, "error": str(e)})
             return []
     
+    @_timed
+    @_cached
+    def get_history_frame(
+        self,
+        city: str,
+        hours: int = 24,
+        fields: Optional[List[str]] = None,
+        since: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Récupère l'historique d'une ville directement sous forme de DataFrame typé.
+        
+        Seuls les champs demandés sont transférés (projection MongoDB). Le curseur
+        est lu par lots de HISTORY_BATCH_SIZE documents, copiés dans des colonnes
+        NumPy préallouées (float32, datetime64 ; NaN/NaT si absent) ; les textes deviennent des
+        catégories. Le DataFrame renvoyé est partagé par le cache : le copier
+        avant de le modifier.
+        
+        Avec `since`, seuls les relevés postérieurs à ce curseur sont renvoyés :
+        un graphique déjà chargé ne récupère que ses nouveaux points.
+        
+        Args:
+            city (str): Nom de la ville
+            hours (int): Nombre d'heures à récupérer (par défaut: 24h)
+            fields (Optional[List[str]]): Colonnes voulues parmi HISTORY_COLUMNS
+                                          (par défaut: toutes ; timestamp est toujours inclus)
+            since (Optional[datetime]): Timestamp du dernier relevé déjà connu ; remplace
+                                        la fenêtre `hours` (timestamp > since)
+            
+        Returns:
+            pd.DataFrame: Relevés triés par date croissante (vide si aucune donnée)
+        
+        Raises:
+            ValueError: Si un champ demandé n'est pas dans HISTORY_COLUMNS
+        """
+        unknown = [field for field in fields or [] if field not in HISTORY_COLUMNS]
+        if unknown:
+            raise ValueError(f"Champs inconnus: {', '.join(unknown)} (attendus: {', '.join(HISTORY_COLUMNS)})")
+        
+        fields = list(fields or HISTORY_COLUMNS)
+        if "timestamp" not in fields:
+            fields.insert(0, "timestamp")
+        
+        numeric = [field for field in fields if HISTORY_COLUMNS[field] != "category"]
+        categorical = [field for field in fields if HISTORY_COLUMNS[field] == "category"]
+        
+        # Colonnes numériques préallouées (agrandies par doublement si nécessaire)
+        capacity = HISTORY_BATCH_SIZE
+        arrays = {field: np.empty(capacity, dtype=HISTORY_COLUMNS[field]) for field in numeric}
+        labels = {field: [] for field in categorical}
+        count = 0
+        
+        try:
+            # Fenêtre complète, ou seulement les relevés postérieurs au curseur
+            if since is not None:
+                time_filter = {"$gt": since}
+            else:
+                time_filter = {"$gte": datetime.now() - timedelta(hours=hours)}
+            
+            # Ne transférer que les champs demandés
+            projection = {"_id": 0, **{field: 1 for field in fields}}
+            cursor = self.collection.find(
+                {"city": city, "timestamp": time_filter},
+                projection
+            ).sort("timestamp", 1).batch_size(HISTORY_BATCH_SIZE)
+            
+            while True:
+                batch = list(islice(cursor, HISTORY_BATCH_SIZE))
+                if not batch:
+                    break
+                
+                # Agrandir les colonnes si le lot ne tient pas
+                if count + len(batch) > capacity:
+                    while count + len(batch) > capacity:
+                        capacity *= 2
+                    for field in numeric:
+                        grown = np.empty(capacity, dtype=HISTORY_COLUMNS[field])
+                        grown[:count] = arrays[field][:count]
+                        arrays[field] = grown
+                
+                # Copier le lot colonne par colonne
+                end = count + len(batch)
+                for field in numeric:
+                    missing = MISSING_VALUES[HISTORY_COLUMNS[field]]
+                    arrays[field][count:end] = [
+                        missing if doc.get(field) is None else doc[field] for doc in batch
+                    ]
+                for field in categorical:
+                    labels[field].extend(doc.get(field) for doc in batch)
+                count = end
+                
+        except Exception as e:
+            logger.error("Erreur de récupération de l'historique", extra={"city": city, "error": str(e)})
+            count = 0
+            labels = {field: [] for field in categorical}
+        
+        # Assembler le DataFrame dans l'ordre des champs demandés
+        columns = {}
+        for field in fields:
+            if field in arrays:
+                columns[field] = arrays[field][:count]
+            else:
+                columns[field] = pd.Categorical(labels[field])
+        return pd.DataFrame(columns)
+    
+    def _aggregate_history(self, city: str, start_time: datetime, bucket: str) -> List[Dict]:
+        """
+        Agrège l'historique d'une ville par intervalle avec $dateTrunc (MongoDB 5.0+).
+        
+        Args:
+            city (str): Nom de la ville
+            start_time (datetime): Début de la fenêtre
+            bucket (str): Nom de l'intervalle (clé de HISTORY_BUCKETS)
+            
+        Returns:
+            List[Dict]: Un point par intervalle, trié par date croissante
+        """
+        unit, bin_size, _ = HISTORY_BUCKETS[bucket]
+        
+        # Début de l'intervalle, moyenne/min/max de chaque mesure et nombre de relevés
+        group = {
+            "_id": {"$dateTrunc": {"date": "$timestamp", "unit": unit, "binSize": bin_size}},
+            "city": {"$first": "$city"},
+            "count": {"$sum": 1}
+        }
+        for field in NUMERIC_FIELDS:
+            group[field] = {"$avg": f"${field}"}
+            group[f"{field}_min"] = {"$min": f"${field}"}
+            group[f"{field}_max"] = {"$max": f"${field}"}
+        
+        pipeline = [
+            {"$match": {"city": city, "timestamp": {"$gte": start_time}}},
+            {"$group": group},
+            {"$sort": {"_id": 1}},
+            {"$addFields": {"timestamp": "$_id"}},  # Le début de l'intervalle devient le timestamp
+            {"$project": {"_id": 0}}
+        ]
+        return list(self.collection.aggregate(pipeline))
+    
+    @_timed
+    @_cached
     def get_all_cities(self) -> List[str]:
         """
         Récupère la liste de toutes les villes présentes dans la base de données.
@@ -167,13 +1322,16 @@ class WeatherDB:
             return sorted(cities)
             
         except Exception as e:
-            print(f"[ERREUR] Erreur de récupération des villes: {e}")
+            logger.error("Erreur de récupération des villes", extra={"error": str(e)})
             return []
     
+    @_timed
     def get_comparison_data(self, cities: List[str]) -> Dict[str, Dict]:
         """
         Récupère les données météo les plus récentes pour plusieurs villes.
         Utilisé pour le dashboard de comparaison multi-villes.
+        Les villes connues sont servies depuis la table en mémoire ; les
+        autres en un seul aller-retour vers MongoDB.
         
         Args:
             cities (List[str]): Liste des noms de villes à comparer
@@ -182,18 +1340,119 @@ class WeatherDB:
             Dict[str, Dict]: Dictionnaire mappant chaque ville à ses données météo
                             Exemple: {"Casablanca": {...}, "Rabat": {...}}
         """
-        # Initialiser le dictionnaire de résultats
-        result = {}
+        # Villes déjà connues en mémoire
+        latest = self.latest.get_many(cities) if self.latest is not None else {}
+        missing = [city for city in cities if city not in latest]
+        if self.latest is not None:
+            CACHE_REQUESTS.inc(len(latest), cache="latest", result="hit")
+            CACHE_REQUESTS.inc(len(missing), cache="latest", result="miss")
+        if not missing:
+            return latest
         
-        # Pour chaque ville, récupérer les données les plus récentes
-        for city in cities:
-            data = self.get_latest_weather(city)
+        try:
+            # Une seule agrégation pour toutes les villes manquantes
+            docs = self._aggregate_latest(missing)
+            self._remember_latest(docs)
+            latest.update((doc["city"], doc) for doc in docs)
             
-            # Ajouter au résultat seulement si des données existent
-            if data:
-                result[city] = data
+            # Conserver l'ordre de la sélection, seulement pour les villes ayant des données
+            return {city: latest[city] for city in cities if city in latest}
+            
+        except Exception as e:
+            logger.error("Erreur de récupération des données de comparaison", extra={"cities": len(cities), "error": str(e)})
+            return {}
+    
+    def watch_readings(
+        self,
+        callback,
+        stop_event: threading.Event,
+        poll_interval: Optional[float] = None
+    ):
+        """
+        Transmet chaque nouveau relevé à `callback` jusqu'à ce que `stop_event`
+        soit levé. Bloquant : à exécuter dans un thread dédié.
+        
+        Utilise un change stream sur les insertions (replica set, Atlas). Si le
+        serveur ne les supporte pas (serveur autonome, collection time-series),
+        se replie sur un suivi par ordre d'insertion (_id) toutes les `poll_interval` secondes.
+        
+        Args:
+            callback: Fonction appelée avec chaque nouveau document
+            stop_event (threading.Event): Signal d'arrêt
+            poll_interval (Optional[float]): Intervalle du suivi par requêtes
+                                             (par défaut: LIVE_POLL_INTERVAL)
+        """
+        poll_interval = poll_interval or LIVE_POLL_INTERVAL
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        resume_token = None
+        
+        # Client fourni sans change streams (ex: mongomock) : suivi par requêtes
+        if not hasattr(type(self.collection), "watch"):
+            logger.info("Change streams non pris en charge par ce client, suivi par _id")
+            self._tail_by_id(callback, stop_event, poll_interval)
+            return
+        
+        while not stop_event.is_set():
+            try:
+                with self.collection.watch(
+                    pipeline, resume_after=resume_token, max_await_time_ms=1000
+                ) as stream:
+                    logger.info("Suivi des nouveaux relevés par change stream")
+                    while not stop_event.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            callback(change["fullDocument"])
+                        # Reprendre au même point en cas de coupure
+                        resume_token = stream.resume_token
+                return
                 
-        return result
+            except OperationFailure as e:
+                # Change streams non supportés par ce serveur ou cette collection
+                logger.info("Change streams indisponibles, suivi par _id", extra={"code": e.code})
+                break
+            except PyMongoError as e:
+                # Erreur réseau : réessayer après une pause
+                logger.error("Change stream interrompu", extra={"error": str(e)})
+                stop_event.wait(poll_interval)
+        
+        self._tail_by_id(callback, stop_event, poll_interval)
+    
+    def _tail_by_id(self, callback, stop_event: threading.Event, poll_interval: float):
+        """
+        Suivi des nouveaux relevés par requêtes périodiques sur l'_id (index
+        par défaut). L'ObjectId est daté à l'insertion : un relevé arrivé en
+        retard (timestamp ancien) ou dans la même seconde qu'un autre est vu.
+        Chaque requête recouvre les LIVE_POLL_OVERLAP dernières secondes ; les
+        _id déjà transmis sont ignorés.
+        
+        Args:
+            callback: Fonction appelée avec chaque nouveau document
+            stop_event (threading.Event): Signal d'arrêt
+            poll_interval (float): Secondes entre deux requêtes
+        """
+        overlap = timedelta(seconds=LIVE_POLL_OVERLAP)
+        
+        # Partir du dernier relevé inséré ; ceux de la fenêtre sont déjà connus
+        last = self.collection.find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+        cursor_time = last["_id"].generation_time if last else datetime.now(timezone.utc)
+        seen = set(self.collection.distinct("_id", {"_id": {"$gte": ObjectId.from_datetime(cursor_time - overlap)}}))
+        
+        # wait() renvoie True dès que l'arrêt est demandé
+        while not stop_event.wait(poll_interval):
+            try:
+                since = ObjectId.from_datetime(cursor_time - overlap)
+                for doc in self.collection.find({"_id": {"$gte": since}}).sort("_id", 1):
+                    if doc["_id"] in seen:
+                        continue
+                    callback(doc)
+                    seen.add(doc["_id"])
+                    cursor_time = max(cursor_time, doc["_id"].generation_time)
+                
+                # Oublier les _id sortis de la fenêtre de recouvrement
+                horizon = cursor_time - overlap
+                seen = {oid for oid in seen if oid.generation_time >= horizon}
+            except PyMongoError as e:
+                logger.error("Échec du suivi des nouveaux relevés", extra={"error": str(e)})
     
     def close(self):
         """
@@ -202,7 +1461,8 @@ class WeatherDB:
         """
         if self.client:
             self.client.close()
-            print("[OK] Connexion MongoDB fermée")
+            self.client = None  # Une connexion ultérieure ouvrira un nouveau client
+            logger.info("Connexion MongoDB fermée")
 
 
 # ============================================================================
@@ -231,3 +1491,51 @@ def get_db() -> WeatherDB:
         
     # Retourner l'instance (nouvelle ou existante)
     return _db_instance
+
+
+# ============================================================================
+# ADMINISTRATION EN LIGNE DE COMMANDE
+# ============================================================================
+# Exemples : python db.py indexes --city Casablanca
+#            python db.py migrate-timeseries --batch-size 5000
+#            python db.py rebuild-rollups
+
+if __name__ == "__main__":
+    import argparse  # Pour analyser les arguments de la ligne de commande
+    import json  # Pour afficher les rapports lisiblement
+    
+    parser = argparse.ArgumentParser(description="Administration de la base Climatrack")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    # Commande "indexes" : créer les index puis afficher leur utilisation
+    indexes_parser = subparsers.add_parser(
+        "indexes", help="Créer les index et afficher $indexStats et les plans d'exécution"
+    )
+    indexes_parser.add_argument("--city", help="Ville utilisée pour expliquer les requêtes")
+    
+    # Commande "migrate-timeseries" : copier les relevés vers la collection time-series
+    migrate_parser = subparsers.add_parser(
+        "migrate-timeseries", help="Copier weather_realtime vers la collection time-series"
+    )
+    migrate_parser.add_argument("--batch-size", type=int, default=5000, help="Documents par lot")
+    
+    # Commande "rebuild-rollups" : recalculer weather_hourly et weather_daily
+    subparsers.add_parser(
+        "rebuild-rollups", help="Recalculer les collections pré-agrégées depuis les relevés bruts"
+    )
+    
+    args = parser.parse_args()
+    
+    db = WeatherDB()
+    if not db.connect():
+        raise SystemExit(1)
+    
+    if args.command == "indexes":
+        report = db.index_report(args.city)
+        print(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+    elif args.command == "migrate-timeseries":
+        db.migrate_to_timeseries(batch_size=args.batch_size)
+    elif args.command == "rebuild-rollups":
+        db.rebuild_rollups()
+    
+    db.close()
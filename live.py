@@ -0,0 +1,114 @@
+"""
+Flux de Données en Direct - Climatrack Maroc
+============================================
+Écoute unique et partagée des nouveaux relevés MongoDB (change stream, ou
+suivi par _id sur un serveur autonome). Les relevés reçus, y compris
+ceux écrits par un autre processus (python scheduler.py), alimentent la table
+des derniers relevés de WeatherDB, lue par l'interface sans requête MongoDB
+par visiteur.
+"""
+
+import threading  # Pour le thread d'écoute
+from datetime import datetime  # Pour horodater la dernière mise à jour
+from typing import Dict, List, Optional  # Pour le typage des fonctions
+
+from db import LatestStore  # Table des derniers relevés par ville
+
+
+class LiveFeed:
+    """
+    Écoute des nouveaux relevés et table des derniers relevés par ville.
+    Une seule instance suffit par processus (voir st.cache_resource dans app.py).
+    """
+    
+    def __init__(self, db, poll_interval: Optional[float] = None):
+        """
+        Args:
+            db: Instance de la base de données MongoDB
+            poll_interval (Optional[float]): Intervalle du suivi par requêtes
+                                             (par défaut: LIVE_POLL_INTERVAL de db.py)
+        """
+        self.db = db
+        self.poll_interval = poll_interval
+        
+        # Dernier relevé connu par ville (celui de la base si elle en tient un)
+        self.store = db.latest if db.latest is not None else LatestStore()
+        
+        # Signal d'arrêt et thread d'écoute
+        self._stop_event = threading.Event()
+        self._thread = None
+        
+        # Date de réception du dernier relevé, et nombre de relevés reçus
+        # (l'interface compare ce compteur pour savoir s'il faut se réafficher)
+        self.last_update: Optional[datetime] = None
+        self.version = 0
+    
+    @property
+    def is_running(self) -> bool:
+        """
+        Indique si le thread d'écoute est actif.
+        """
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _on_reading(self, doc: Dict):
+        """
+        Enregistre un nouveau relevé (ignoré s'il est plus ancien que celui connu)
+        et invalide le cache des lectures : un relevé écrit par un autre
+        processus doit apparaître dans l'historique, pas seulement dans la
+        table des derniers relevés.
+        
+        Args:
+            doc (Dict): Document inséré dans la collection des relevés
+        """
+        self.store.update([doc])
+        self.db.cache.invalidate()
+        self.last_update = datetime.now()
+        self.version += 1
+    
+    def latest(self, city: str) -> Optional[Dict]:
+        """
+        Retourne le dernier relevé reçu pour une ville (lecture en mémoire).
+        
+        Args:
+            city (str): Nom de la ville
+        
+        Returns:
+            Optional[Dict]: Dernier relevé, ou None si aucun n'a encore été reçu
+        """
+        return self.store.get(city)
+    
+    def latest_many(self, cities: List[str]) -> Dict[str, Dict]:
+        """
+        Retourne les derniers relevés reçus pour plusieurs villes.
+        
+        Args:
+            cities (List[str]): Liste des noms de villes
+        
+        Returns:
+            Dict[str, Dict]: Dernier relevé par ville (villes sans relevé omises)
+        """
+        return self.store.get_many(cities)
+    
+    def start(self):
+        """
+        Démarre le thread d'écoute (sans effet s'il tourne déjà).
+        """
+        if self.is_running:
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self.db.watch_readings,
+            args=(self._on_reading, self._stop_event, self.poll_interval),
+            name="live-feed",
+            daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """
+        Arrête le thread d'écoute.
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
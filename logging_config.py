@@ -0,0 +1,155 @@
+"""
+Journalisation Structurée - Climatrack Maroc
+============================================
+Journaux des modules d'ingestion et de base de données (weather_service, db,
+async_weather_service...) :
+- non bloquante : les modules déposent les événements dans une file
+  (QueueHandler) ; un thread dédié (QueueListener) les formate et les écrit,
+  les threads d'ingestion ne paient pas les écritures sur la console ;
+- structurée : chaque événement porte des champs (city, provider, latency_ms,
+  outcome...) passés avec extra={...}, écrits en clé=valeur ou en JSON ;
+- filtrable : niveau global (LOG_LEVEL) et niveau par module (LOG_LEVELS).
+
+Exemple : LOG_LEVEL=INFO LOG_LEVELS=weather_service=DEBUG,db=WARNING LOG_FORMAT=json
+"""
+
+import os  # Pour accéder aux variables d'environnement
+import atexit  # Pour vider la file à l'arrêt du processus
+import json  # Pour le format JSON
+import logging  # Journalisation standard
+import queue  # File entre les modules et le thread d'écriture
+import sys  # Pour écrire sur la sortie standard
+import threading  # Pour n'initialiser la journalisation qu'une fois
+from datetime import datetime  # Pour horodater les événements JSON
+from logging.handlers import QueueHandler, QueueListener  # Écriture en arrière-plan
+from typing import Dict  # Pour le typage des fonctions
+from dotenv import load_dotenv  # Pour charger les variables depuis le fichier .env
+
+# Charger les variables d'environnement depuis le fichier .env
+load_dotenv()
+
+# Niveau par défaut (DEBUG, INFO, WARNING, ERROR)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Niveaux par module, ex: "weather_service=DEBUG,db=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# Format des lignes : "text" (lisible) ou "json" (une ligne JSON par événement)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Fichier de journal supplémentaire (vide = sortie standard uniquement)
+LOG_FILE = os.getenv("LOG_FILE", "")
+
+# Journal parent de tous les modules du projet
+ROOT_LOGGER = "climatrack"
+
+# Étiquette affichée par niveau (format texte)
+LEVEL_TAGS = {
+    logging.DEBUG: "DEBUG",
+    logging.INFO: "INFO",
+    logging.WARNING: "ATTENTION",
+    logging.ERROR: "ERREUR",
+    logging.CRITICAL: "CRITIQUE"
+}
+
+# Attributs standard d'un LogRecord : tout autre attribut est un champ de l'événement
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _fields(record: logging.LogRecord) -> Dict:
+    """
+    Champs de l'événement passés avec extra={...}.
+    """
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Format lisible : [NIVEAU] message clé=valeur ...
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"[{LEVEL_TAGS.get(record.levelno, record.levelname)}] {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Une ligne JSON par événement, pour l'agrégation des journaux.
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **_fields(record)
+        }
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _parse_levels(value: str) -> Dict[str, str]:
+    """
+    Convertit "module=NIVEAU,..." en dictionnaire (entrées mal formées ignorées).
+    """
+    levels = {}
+    for item in value.split(","):
+        module, _, level = item.partition("=")
+        if module.strip() and level.strip():
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging():
+    """
+    Installe la file de journalisation et le thread d'écriture (une seule
+    fois par processus), puis applique les niveaux configurés.
+    """
+    global _listener
+    
+    with _setup_lock:
+        if _listener is not None:
+            return
+        
+        formatter = JsonFormatter() if LOG_FORMAT == "json" else TextFormatter()
+        handlers = [logging.StreamHandler(sys.stdout)]
+        if LOG_FILE:
+            handlers.append(logging.FileHandler(LOG_FILE, encoding="utf-8"))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        # Les modules ne font que déposer l'événement dans la file
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, *handlers)
+        _listener.start()
+        atexit.register(_listener.stop)  # Écrire les derniers événements avant de quitter
+        
+        root = logging.getLogger(ROOT_LOGGER)
+        root.addHandler(QueueHandler(log_queue))
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        
+        for module, level in _parse_levels(LOG_LEVELS).items():
+            logging.getLogger(f"{ROOT_LOGGER}.{module}").setLevel(level)
+
+
+def get_logger(module: str) -> logging.Logger:
+    """
+    Retourne le journal d'un module (ex: get_logger("db") -> "climatrack.db").
+    
+    Args:
+        module (str): Nom court du module, utilisé dans LOG_LEVELS
+    
+    Returns:
+        logging.Logger: Journal prêt à l'emploi
+    """
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{module}")
@@ -0,0 +1,442 @@
+"""
+Métriques d'Exécution - Climatrack Maroc
+========================================
+Compteurs et histogrammes en mémoire, sans dépendance externe, pour savoir
+où passe le temps d'une mise à jour : latence des fournisseurs météo et
+nouvelles tentatives, replis sur les données simulées, durée des opérations
+MongoDB par méthode de WeatherDB, documents écrits et taux de succès des caches.
+
+Deux expositions, activées par variables d'environnement :
+- METRICS_PORT : endpoint HTTP au format texte Prometheus (http://hôte:port/metrics)
+- METRICS_DUMP_FILE : fichier JSON réécrit toutes les METRICS_DUMP_INTERVAL secondes
+"""
+
+import os  # Pour accéder aux variables d'environnement
+import json  # Pour l'export périodique
+import threading  # Pour protéger les compteurs et exécuter les exports en arrière-plan
+import time  # Pour chronométrer les blocs mesurés
+from bisect import bisect_left  # Pour trouver l'intervalle d'une observation
+from contextlib import contextmanager  # Pour chronométrer un bloc avec with
+from datetime import datetime  # Pour horodater l'export JSON
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Endpoint Prometheus
+from typing import Dict, Iterator, List, Optional, Tuple  # Pour le typage des fonctions
+from dotenv import load_dotenv  # Pour charger les variables depuis le fichier .env
+
+from logging_config import get_logger  # Journalisation structurée
+
+# Charger les variables d'environnement depuis le fichier .env
+load_dotenv()
+
+# Journal du module
+logger = get_logger("metrics")
+
+# Port de l'endpoint Prometheus (0 = désactivé)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Fichier de l'export JSON périodique (vide = désactivé) et intervalle en secondes
+METRICS_DUMP_FILE = os.getenv("METRICS_DUMP_FILE", "")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+
+# Bornes (en secondes) des intervalles des histogrammes de durée
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    """
+    Échappe une valeur d'étiquette (antislash, guillemet, retour à la ligne).
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """
+    Formate des étiquettes au format texte Prometheus : {nom="valeur",...}.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Counter:
+    """
+    Compteur croissant, une valeur par combinaison d'étiquettes.
+    """
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        """
+        Args:
+            name (str): Nom de la métrique (ex: "climatrack_documents_written_total")
+            documentation (str): Description affichée dans l'export Prometheus
+            labelnames (Tuple[str, ...]): Noms des étiquettes
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        """
+        Ajoute `amount` à la valeur correspondant aux étiquettes.
+        """
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def values(self) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Retourne les valeurs actuelles : (étiquettes, valeur).
+        """
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+    
+    def render(self) -> List[str]:
+        """
+        Lignes de la métrique au format texte Prometheus.
+        """
+        return [f"{self.name}{_format_labels(labels)} {value}" for labels, value in self.values()]
+    
+    def snapshot(self) -> List[Dict]:
+        """
+        Valeurs de la métrique pour l'export JSON.
+        """
+        return [{"labels": labels, "value": value} for labels, value in self.values()]
+
+
+class Histogram:
+    """
+    Histogramme de durées (en secondes), par combinaison d'étiquettes :
+    nombre d'observations par intervalle, somme et nombre total.
+    """
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        """
+        Args:
+            name (str): Nom de la métrique (ex: "climatrack_db_operation_seconds")
+            documentation (str): Description affichée dans l'export Prometheus
+            labelnames (Tuple[str, ...]): Noms des étiquettes
+            buckets (Tuple[float, ...]): Bornes supérieures croissantes des intervalles
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # étiquettes -> [nombre par intervalle (dernier = au-delà), somme, total]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        """
+        Enregistre une observation (en secondes).
+        """
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Mesure la durée du bloc et l'enregistre avec les étiquettes données.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def _cumulative(self) -> List[Tuple[Dict[str, str], List[int], float, int]]:
+        """
+        Séries avec les nombres cumulés par borne : (étiquettes, cumuls, somme, total).
+        """
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        
+        result = []
+        for key, counts, total, count in series:
+            cumulative, running = [], 0
+            for bucket_count in counts[:-1]:
+                running += bucket_count
+                cumulative.append(running)
+            result.append((dict(zip(self.labelnames, key)), cumulative, total, count))
+        return result
+    
+    def render(self) -> List[str]:
+        """
+        Lignes de la métrique au format texte Prometheus.
+        """
+        lines = []
+        for labels, cumulative, total, count in self._cumulative():
+            for bound, value in zip(self.buckets, cumulative):
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {value}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+    
+    def snapshot(self) -> List[Dict]:
+        """
+        Valeurs de la métrique pour l'export JSON (moyenne comprise).
+        """
+        return [
+            {
+                "labels": labels,
+                "count": count,
+                "sum": round(total, 6),
+                "mean": round(total / count, 6) if count else None,
+                "buckets": {str(bound): value for bound, value in zip(self.buckets, cumulative)}
+            }
+            for labels, cumulative, total, count in self._cumulative()
+        ]
+
+
+class Registry:
+    """
+    Ensemble des métriques exportées par le processus.
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric):
+        """
+        Ajoute une métrique (ou retourne celle déjà enregistrée sous ce nom).
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+    
+    def render(self) -> str:
+        """
+        Toutes les métriques au format texte Prometheus (version 0.0.4).
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Toutes les métriques sous forme de dictionnaire (export JSON).
+        """
+        return {
+            metric.name: {"type": metric.kind, "help": metric.documentation, "values": metric.snapshot()}
+            for metric in list(self._metrics.values())
+        }
+
+
+# Registre du processus
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    """
+    Crée et enregistre un compteur.
+    """
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Tuple[str, ...] = (),
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+) -> Histogram:
+    """
+    Crée et enregistre un histogramme de durées.
+    """
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ============================================================================
+# MÉTRIQUES DE L'APPLICATION
+# ============================================================================
+
+# Fournisseurs météo
+PROVIDER_LATENCY = histogram(
+    "climatrack_provider_request_seconds",
+    "Durée des requêtes aux fournisseurs météo (nouvelles tentatives comprises)",
+    ("provider", "kind", "outcome")
+)
+PROVIDER_RETRIES = counter(
+    "climatrack_provider_retries_total",
+    "Nouvelles tentatives de requêtes aux fournisseurs météo",
+    ("provider",)
+)
+MOCK_READINGS = counter(
+    "climatrack_mock_readings_total",
+    "Relevés simulés générés, par raison (mock_mode, no_api_key, no_provider)",
+    ("reason",)
+)
+
+# Mises à jour
+INGESTION_LATENCY = histogram(
+    "climatrack_ingestion_seconds",
+    "Durée des mises à jour complètes (récupération et sauvegarde)",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+INGESTION_CITIES = counter(
+    "climatrack_ingestion_cities_total",
+    "Villes traitées par les mises à jour, par statut",
+    ("status",)
+)
+
+# MongoDB
+DB_LATENCY = histogram(
+    "climatrack_db_operation_seconds",
+    "Durée des opérations de WeatherDB, par méthode",
+    ("method",)
+)
+DOCUMENTS_WRITTEN = counter(
+    "climatrack_documents_written_total",
+    "Relevés écrits dans MongoDB, par méthode",
+    ("method",)
+)
+
+# Caches : "query" (lectures MongoDB), "latest" (derniers relevés), "response" (réponses API)
+CACHE_REQUESTS = counter(
+    "climatrack_cache_requests_total",
+    "Consultations des caches, par cache et par résultat (hit / miss)",
+    ("cache", "result")
+)
+
+
+def cache_hit_rates() -> Dict[str, Optional[float]]:
+    """
+    Taux de succès de chaque cache depuis le démarrage du processus.
+    
+    Returns:
+        Dict[str, Optional[float]]: Cache -> part des consultations servies (0 à 1)
+    """
+    totals: Dict[str, Dict[str, float]] = {}
+    for labels, value in CACHE_REQUESTS.values():
+        totals.setdefault(labels["cache"], {}).setdefault(labels["result"], 0)
+        totals[labels["cache"]][labels["result"]] += value
+    
+    return {
+        cache: round(counts.get("hit", 0) / sum(counts.values()), 4) if sum(counts.values()) else None
+        for cache, counts in totals.items()
+    }
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Sert les métriques au format texte Prometheus sur /metrics.
+    """
+    
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Pas de ligne de journal à chaque collecte
+        pass
+
+
+def start_http_server(port: int, host: str = "") -> Optional[ThreadingHTTPServer]:
+    """
+    Démarre l'endpoint Prometheus dans un thread d'arrière-plan.
+    
+    Args:
+        port (int): Port d'écoute
+        host (str): Adresse d'écoute (par défaut: toutes)
+    
+    Returns:
+        Optional[ThreadingHTTPServer]: Serveur démarré, ou None si le port est indisponible
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error("Endpoint des métriques indisponible", extra={"port": port, "error": str(e)})
+        return None
+    
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Métriques exposées", extra={"url": f"http://localhost:{server.server_address[1]}/metrics"})
+    return server
+
+
+def dump_json(path: str):
+    """
+    Écrit toutes les métriques et les taux de succès des caches dans un fichier JSON.
+    """
+    content = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "cache_hit_rates": cache_hit_rates(),
+        "metrics": REGISTRY.snapshot()
+    }
+    try:
+        # Écriture dans un fichier temporaire puis remplacement (jamais de fichier à moitié écrit)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(content, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error("Impossible d'écrire les métriques", extra={"path": path, "error": str(e)})
+
+
+def start_json_dump(path: str, interval: float) -> threading.Thread:
+    """
+    Réécrit le fichier JSON des métriques toutes les `interval` secondes,
+    dans un thread d'arrière-plan.
+    """
+    def loop():
+        while True:
+            time.sleep(interval)
+            dump_json(path)
+    
+    thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    thread.start()
+    logger.info("Export JSON des métriques démarré", extra={"path": path, "interval_s": interval})
+    return thread
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    """
+    Démarre les expositions configurées (METRICS_PORT, METRICS_DUMP_FILE).
+    Sans effet si elles sont déjà démarrées dans ce processus.
+    """
+    global _exporters_started
+    
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+    if METRICS_DUMP_FILE:
+        start_json_dump(METRICS_DUMP_FILE, METRICS_DUMP_INTERVAL)
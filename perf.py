@@ -0,0 +1,61 @@
+"""
+Chronométrage des Phases d'Affichage - Climatrack Maroc
+=======================================================
+Mesure, à chaque exécution du script Streamlit, le temps passé dans chaque
+phase (requêtes MongoDB, construction des DataFrames, des figures Plotly et
+sérialisation vers le navigateur) pour chaque onglet.
+
+Les durées de la dernière exécution sont conservées dans
+st.session_state["phase_timings"] et relues par benchmark_app.py.
+"""
+
+import time  # Pour mesurer les durées
+from contextlib import contextmanager  # Pour délimiter une phase avec un bloc with
+from typing import Dict, Iterator  # Pour le typage des fonctions
+
+# Phases mesurées, dans l'ordre d'exécution d'un onglet
+PHASES = ["db", "dataframe", "figure", "serialisation"]
+
+
+class PhaseTimer:
+    """
+    Cumule les durées (en millisecondes) par onglet et par phase.
+    
+    Utilisation :
+        timer = PhaseTimer()
+        with timer.phase("tendances", "figure"):
+            fig = px.line(...)
+    """
+    
+    def __init__(self):
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._started = time.perf_counter()
+    
+    @contextmanager
+    def phase(self, tab: str, name: str) -> Iterator[None]:
+        """
+        Mesure le bloc et ajoute sa durée à la phase `name` de l'onglet `tab`
+        (une phase peut être mesurée en plusieurs fois).
+        
+        Args:
+            tab (str): Onglet (ou partie commune) concerné
+            name (str): Phase (voir PHASES)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            tab_timings = self.timings.setdefault(tab, {})
+            tab_timings[name] = tab_timings.get(name, 0.0) + (time.perf_counter() - start) * 1000
+    
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Retourne les durées mesurées, avec la durée totale de l'exécution
+        depuis la création du chronomètre (clé "total").
+        
+        Returns:
+            Dict[str, Dict[str, float]]: Onglet -> phase -> durée (ms)
+        """
+        report = {tab: dict(phases) for tab, phases in self.timings.items()}
+        report["total"] = {"script": (time.perf_counter() - self._started) * 1000}
+        return report
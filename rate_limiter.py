@@ -0,0 +1,198 @@
+"""
+Limiteur de Débit des APIs Météo - Climatrack Maroc
+===================================================
+Seau à jetons (token bucket) par fournisseur et par clé API, avec un quota
+par minute et un quota journalier.
+
+L'état des seaux est conservé dans une petite base SQLite locale : il est
+partagé par tous les threads d'ingestion et par tous les processus de la
+machine (application Streamlit, python scheduler.py...). Les transactions
+BEGIN IMMEDIATE sérialisent les prises de jetons entre processus.
+"""
+
+import os  # Pour accéder aux variables d'environnement
+import hashlib  # Pour ne pas stocker les clés API en clair
+import sqlite3  # Pour partager les compteurs entre processus
+import threading  # Pour une connexion SQLite par thread
+import time  # Pour le remplissage des seaux et les attentes
+from datetime import datetime, timezone  # Pour le quota journalier (jour UTC)
+from typing import Optional  # Pour le typage des fonctions
+from dotenv import load_dotenv  # Pour charger les variables depuis le fichier .env
+
+from logging_config import get_logger  # Journalisation structurée
+
+# Charger les variables d'environnement depuis le fichier .env
+load_dotenv()
+
+# Journal du module
+logger = get_logger("rate_limiter")
+
+# Fichier SQLite contenant l'état des seaux
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", ".rate_limit.sqlite3")
+
+# Attente maximale (en secondes) pour obtenir un jeton avant d'abandonner l'appel
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))
+
+# Quotas par fournisseur : (appels par minute, appels par jour), 0 = illimité
+RATE_LIMITS = {
+    "openweather": (
+        int(os.getenv("OWM_CALLS_PER_MINUTE", "60")),
+        int(os.getenv("OWM_CALLS_PER_DAY", "0"))
+    ),
+    "weatherapi": (
+        int(os.getenv("WEATHERAPI_CALLS_PER_MINUTE", "60")),
+        int(os.getenv("WEATHERAPI_CALLS_PER_DAY", "0"))
+    )
+}
+
+
+class RateLimiter:
+    """
+    Seau à jetons partagé entre threads et processus.
+    Le seau contient au plus `per_minute` jetons et se remplit de
+    `per_minute` jetons par minute ; chaque appel API consomme un jeton
+    et incrémente le compteur du jour.
+    """
+    
+    def __init__(self, key: str, per_minute: int, per_day: int = 0, path: Optional[str] = None):
+        """
+        Args:
+            key (str): Identifiant du seau (fournisseur et empreinte de la clé API)
+            per_minute (int): Appels autorisés par minute (0 = illimité)
+            per_day (int): Appels autorisés par jour UTC (0 = illimité)
+            path (Optional[str]): Fichier SQLite (par défaut: RATE_LIMIT_DB)
+        """
+        self.key = key
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.path = path or RATE_LIMIT_DB
+        
+        # Une connexion SQLite par thread (les connexions ne se partagent pas)
+        self._local = threading.local()
+        self._create_tables()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Retourne la connexion SQLite du thread courant (créée au premier appel).
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None : transactions gérées explicitement (BEGIN IMMEDIATE)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+    
+    def _create_tables(self):
+        """
+        Crée les tables des seaux et des compteurs journaliers si besoin.
+        """
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS daily ("
+            "key TEXT NOT NULL, day TEXT NOT NULL, calls INTEGER NOT NULL, PRIMARY KEY (key, day))"
+        )
+    
+    def _try_acquire(self) -> float:
+        """
+        Tente de prendre un jeton en une transaction.
+        
+        Returns:
+            float: 0 si un jeton a été pris, sinon le délai (s) avant le prochain jeton
+                   (infini si le quota du jour est épuisé)
+        """
+        conn = self._connection()
+        now = time.time()
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        
+        # Verrou en écriture dès le début : la lecture et la mise à jour sont atomiques
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Quota journalier
+            row = conn.execute(
+                "SELECT calls FROM daily WHERE key = ? AND day = ?", (self.key, day)
+            ).fetchone()
+            calls = row[0] if row else 0
+            if self.per_day and calls >= self.per_day:
+                conn.execute("COMMIT")
+                return float("inf")
+            
+            # Quota par minute : remplir le seau selon le temps écoulé
+            if self.per_minute:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM buckets WHERE key = ?", (self.key,)
+                ).fetchone()
+                rate = self.per_minute / 60.0  # Jetons par seconde
+                tokens = self.per_minute if row is None else min(
+                    self.per_minute, row[0] + (now - row[1]) * rate
+                )
+                if tokens < 1:
+                    conn.execute("COMMIT")
+                    return (1 - tokens) / rate
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (self.key, tokens - 1, now)
+                )
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO daily (key, day, calls) VALUES (?, ?, ?)",
+                (self.key, day, calls + 1)
+            )
+            conn.execute("COMMIT")
+            return 0.0
+        
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Prend un jeton, en attendant au plus `timeout` secondes qu'il s'en libère un.
+        
+        Args:
+            timeout (Optional[float]): Attente maximale (par défaut: RATE_LIMIT_MAX_WAIT)
+        
+        Returns:
+            bool: True si l'appel est autorisé, False si le quota ne le permet pas à temps
+        """
+        if not self.per_minute and not self.per_day:
+            return True
+        
+        timeout = RATE_LIMIT_MAX_WAIT if timeout is None else timeout
+        end_time = time.monotonic() + timeout
+        
+        while True:
+            try:
+                delay = self._try_acquire()
+            except sqlite3.Error as e:
+                # Un compteur indisponible ne doit pas bloquer l'ingestion
+                logger.error("Limiteur de débit indisponible", extra={"key": self.key, "error": str(e)})
+                return True
+            
+            if delay == 0:
+                return True
+            
+            remaining = end_time - time.monotonic()
+            if delay > remaining:
+                return False
+            time.sleep(delay)
+
+
+def create_rate_limiter(provider: str, api_key: str) -> RateLimiter:
+    """
+    Crée le limiteur d'un fournisseur selon ses quotas configurés.
+    Le seau est propre à la clé API : deux clés différentes ont chacune leur quota.
+    
+    Args:
+        provider (str): Fournisseur ("openweather" ou "weatherapi")
+        api_key (str): Clé API utilisée
+    
+    Returns:
+        RateLimiter: Limiteur partagé avec les autres processus de la machine
+    """
+    per_minute, per_day = RATE_LIMITS.get(provider, (0, 0))
+    fingerprint = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    return RateLimiter(f"{provider}:{fingerprint}", per_minute, per_day)
@@ -0,0 +1,236 @@
+"""
+Planificateur d'Ingestion - Climatrack Maroc
+============================================
+Exécute la mise à jour des données météo à cadence fixe, indépendamment de
+l'interface Streamlit : les appels API ne dépendent plus du nombre de visiteurs
+et l'interface se contente de relire MongoDB.
+
+Deux modes d'utilisation :
+- processus autonome : python scheduler.py (INGESTION_MODE=external côté app)
+- thread d'arrière-plan unique par processus (get_scheduler), partagé par les sessions Streamlit
+"""
+
+import os  # Pour accéder aux variables d'environnement
+import threading  # Pour le thread d'arrière-plan et le verrou anti-chevauchement
+import time  # Pour respecter la cadence
+from datetime import datetime  # Pour horodater la dernière exécution
+from typing import Dict, List, Optional  # Pour le typage des fonctions
+from dotenv import load_dotenv  # Pour charger les variables depuis le fichier .env
+
+from logging_config import get_logger  # Journalisation structurée
+from weather_service import WeatherService, update_weather_data  # Service de récupération météo
+
+# Charger les variables d'environnement depuis le fichier .env
+load_dotenv()
+
+# Journal du module
+logger = get_logger("scheduler")
+
+# Intervalle (en secondes) entre deux ingestions
+INGESTION_INTERVAL = float(os.getenv("INGESTION_INTERVAL", "60"))
+
+# Qui assure l'ingestion automatique : "embedded" (thread partagé de l'application)
+# ou "external" (processus séparé lancé avec python scheduler.py)
+INGESTION_MODE = os.getenv("INGESTION_MODE", "embedded")
+
+# Données simulées pour l'ingestion de l'application (fixé par la configuration,
+# pas par une session, pour qu'un seul mode d'ingestion tourne à la fois)
+INGESTION_USE_MOCK = os.getenv("INGESTION_USE_MOCK", "false").lower() == "true"
+
+
+class IngestionScheduler:
+    """
+    Planificateur d'ingestion à cadence fixe.
+    Une seule ingestion peut s'exécuter à la fois : un déclenchement pendant
+    une ingestion en cours est ignoré.
+    """
+    
+    def __init__(
+        self,
+        cities: List[str],
+        db,
+        interval: Optional[float] = None,
+        use_mock: bool = False
+    ):
+        """
+        Initialise le planificateur.
+        
+        Args:
+            cities (List[str]): Villes à mettre à jour
+            db: Instance de la base de données MongoDB
+            interval (Optional[float]): Secondes entre deux ingestions (par défaut: INGESTION_INTERVAL)
+            use_mock (bool): Si True, utilise des données simulées au lieu de l'API
+        """
+        self.cities = cities
+        self.db = db
+        self.interval = interval or INGESTION_INTERVAL
+        self.use_mock = use_mock
+        
+        # Service météo (et sa session HTTP) réutilisé d'une ingestion à l'autre
+        self.service = WeatherService()
+        
+        # Verrou empêchant deux ingestions simultanées
+        self._run_lock = threading.Lock()
+        
+        # Signal d'arrêt et thread d'arrière-plan (démarrage/arrêt protégés
+        # par un verrou : plusieurs sessions peuvent les demander en même temps)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._state_lock = threading.Lock()
+        
+        # Résultat de la dernière ingestion
+        self.last_run: Optional[datetime] = None
+        self.last_results: List[Dict] = []
+    
+    @property
+    def is_running(self) -> bool:
+        """
+        Indique si le thread d'arrière-plan est actif.
+        """
+        return self._thread is not None and self._thread.is_alive()
+    
+    def run_once(self) -> Optional[List[Dict]]:
+        """
+        Exécute une ingestion, sauf si une autre est déjà en cours.
+        
+        Returns:
+            Optional[List[Dict]]: Résultats par ville, ou None si l'exécution a été ignorée
+        """
+        # Ne pas attendre : si une ingestion tourne déjà, ses données suffiront
+        if not self._run_lock.acquire(blocking=False):
+            logger.info("Ingestion déjà en cours, déclenchement ignoré")
+            return None
+        
+        try:
+            results = update_weather_data(
+                self.cities, self.db, use_mock=self.use_mock, service=self.service
+            )
+            self.last_run = datetime.now()
+            self.last_results = results
+            return results
+        finally:
+            self._run_lock.release()
+    
+    def _loop(self):
+        """
+        Boucle d'ingestion : une exécution au début de chaque intervalle.
+        """
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            
+            try:
+                self.run_once()
+            except Exception as e:
+                # Une erreur ne doit pas arrêter le planificateur
+                logger.exception("Échec de l'ingestion planifiée", extra={"error": str(e)})
+            
+            # Attendre le début de l'intervalle suivant (ou l'arrêt)
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+    
+    def start(self):
+        """
+        Démarre le thread d'arrière-plan (sans effet s'il tourne déjà).
+        """
+        with self._state_lock:
+            if self.is_running:
+                return
+            
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._loop, name="ingestion-scheduler", daemon=True)
+            self._thread.start()
+        logger.info("Planificateur démarré", extra={"interval_s": self.interval, "mock": self.use_mock})
+    
+    def stop(self):
+        """
+        Arrête le thread d'arrière-plan après l'ingestion en cours, y compris
+        une ingestion déclenchée manuellement (run_once).
+        """
+        with self._state_lock:
+            self._stop_event.set()
+            if self._thread:
+                self._thread.join()
+                self._thread = None
+            
+            # Attendre la fin d'une ingestion manuelle en cours
+            with self._run_lock:
+                pass
+        logger.info("Planificateur arrêté")
+    
+    def run_forever(self):
+        """
+        Exécute la boucle d'ingestion dans le thread courant (processus autonome).
+        S'arrête proprement avec Ctrl+C.
+        """
+        logger.info("Planificateur démarré", extra={"interval_s": self.interval})
+        try:
+            self._loop()
+        except KeyboardInterrupt:
+            logger.info("Planificateur arrêté")
+
+
+_scheduler_instance: Optional[IngestionScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(cities: List[str], db, use_mock: bool = INGESTION_USE_MOCK) -> IngestionScheduler:
+    """
+    Retourne le planificateur unique du processus, partagé par toutes les
+    sessions Streamlit : une seule boucle et un seul verrou d'ingestion.
+    
+    Si le mode demandé diffère de celui du planificateur existant, celui-ci
+    est arrêté (après l'ingestion en cours) puis remplacé ; le nouveau
+    planificateur est démarré si l'ancien tournait.
+    
+    Args:
+        cities (List[str]): Villes à mettre à jour
+        db: Instance de la base de données MongoDB
+        use_mock (bool): Si True, données simulées (par défaut: INGESTION_USE_MOCK)
+    
+    Returns:
+        IngestionScheduler: Planificateur (démarré à la demande)
+    """
+    global _scheduler_instance
+    
+    with _scheduler_lock:
+        current = _scheduler_instance
+        if current is not None and current.use_mock == use_mock:
+            return current
+        
+        was_running = False
+        if current is not None:
+            was_running = current.is_running
+            current.stop()
+            current.service.close()
+            logger.info("Planificateur remplacé", extra={"mock": use_mock})
+        
+        _scheduler_instance = IngestionScheduler(cities, db, use_mock=use_mock)
+        if was_running:
+            _scheduler_instance.start()
+        return _scheduler_instance
+
+
+# ============================================================================
+# PROCESSUS AUTONOME
+# ============================================================================
+# Exemple : python scheduler.py --interval 60
+
+if __name__ == "__main__":
+    import argparse  # Pour analyser les arguments de la ligne de commande
+    
+    from db import get_db  # Gestionnaire de base de données MongoDB
+    from metrics import start_exporters  # Exposition des métriques (METRICS_PORT, METRICS_DUMP_FILE)
+    from weather_service import MOROCCAN_CITIES  # Villes couvertes par le dashboard
+    
+    parser = argparse.ArgumentParser(description="Ingestion météo planifiée")
+    parser.add_argument("--interval", type=float, default=INGESTION_INTERVAL, help="Secondes entre deux ingestions")
+    parser.add_argument("--mock", action="store_true", default=INGESTION_USE_MOCK, help="Utiliser des données simulées")
+    parser.add_argument("--once", action="store_true", help="Exécuter une seule ingestion puis quitter")
+    args = parser.parse_args()
+    
+    start_exporters()
+    scheduler = IngestionScheduler(MOROCCAN_CITIES, get_db(), interval=args.interval, use_mock=args.mock)
+    
+    if args.once:
+        scheduler.run_once()
+    else:
+        scheduler.run_forever()
@@ -0,0 +1,255 @@
+"""
+Générateur d'Historique Simulé - Climatrack Maroc
+=================================================
+Produit en masse, avec NumPy, des relevés simulés réalistes pour les tests
+de charge : N jours × M villes à une cadence de K minutes.
+
+- cycle journalier de la température (minimum vers 3 h, maximum vers 15 h) ;
+- dérive autocorrélée (processus AR(1)) pour la température, l'humidité,
+  la pression et le vent : les valeurs évoluent progressivement d'un relevé
+  à l'autre au lieu d'être tirées indépendamment ;
+- graine reproductible : la même graine produit le même historique.
+
+Les relevés sont écrits dans WeatherDB par lots (save_many).
+
+Exemple : python seed_data.py --days 30 --cadence 10 --seed 42
+"""
+
+import argparse  # Pour analyser les arguments de la ligne de commande
+import time  # Pour mesurer la durée de l'insertion
+from datetime import datetime  # Pour la fin de l'historique
+from typing import Dict, Iterator, List, Optional  # Pour le typage des fonctions
+
+import numpy as np  # Pour générer les séries en bloc
+
+from weather_service import BASE_TEMPERATURES, MOROCCAN_CITIES, SOURCE_MOCK  # Villes et températures de base
+
+# Demi-amplitude (°C) du cycle journalier de la température
+DIURNAL_AMPLITUDE = 5.0
+
+# Dérives AR(1) par mesure : (écart-type stationnaire, constante de temps en heures)
+DRIFTS = {
+    "temperature": (2.0, 12),
+    "humidity": (8.0, 6),
+    "pressure": (4.0, 48),
+    "wind_speed": (4.0, 3)
+}
+
+# Conditions météo selon l'humidité : (seuil minimal, condition, description, icône)
+CONDITIONS = [
+    (85, "Pluie", "pluie légère", "10d"),
+    (75, "Brume", "brume", "50d"),
+    (65, "Nuageux", "nuages épars", "03d"),
+    (50, "Nuageux", "quelques nuages", "02d"),
+    (0, "Ensoleillé", "ciel dégagé", "01d")
+]
+
+# Nombre de relevés par écriture groupée
+SEED_BATCH_SIZE = 10000
+
+
+def _ar1(rng: np.random.Generator, n: int, std: np.ndarray, phi: np.ndarray) -> np.ndarray:
+    """
+    Séries AR(1) centrées et indépendantes : x[t] = phi * x[t-1] + bruit,
+    d'écart-type stationnaire `std` (une colonne par série).
+    
+    Args:
+        rng (np.random.Generator): Générateur aléatoire
+        n (int): Nombre de pas
+        std (np.ndarray): Écart-type de chaque série
+        phi (np.ndarray): Coefficient d'autocorrélation de chaque série (entre 0 et 1)
+    
+    Returns:
+        np.ndarray: Tableau (n, nombre de séries)
+    """
+    series = rng.normal(0.0, 1.0, (n, len(std))) * (std * np.sqrt(1 - phi ** 2))
+    if n == 0:
+        return series
+    series[0] = rng.normal(0.0, 1.0, len(std)) * std
+    
+    # Récurrence du premier ordre : une seule boucle sur le temps, vectorisée sur les séries
+    for i in range(1, n):
+        series[i] += phi * series[i - 1]
+    return series
+
+
+def generate_city(
+    city: str,
+    timestamps: np.ndarray,
+    drift: Dict[str, np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    Calcule toutes les mesures d'une ville, en colonnes.
+    
+    Args:
+        city (str): Nom de la ville
+        timestamps (np.ndarray): Horodatages (datetime64)
+        drift (Dict[str, np.ndarray]): Dérive AR(1) de chaque mesure (voir DRIFTS)
+    
+    Returns:
+        Dict[str, np.ndarray]: Une colonne par champ du document
+    """
+    # Heure de la journée (0-24) et cycle journalier (maximum vers 15 h)
+    hours = (timestamps - timestamps.astype("datetime64[D]")) / np.timedelta64(1, "h")
+    diurnal = np.sin(2 * np.pi * (hours - 9) / 24)
+    
+    base = BASE_TEMPERATURES.get(city, 20)
+    temperature = base + DIURNAL_AMPLITUDE * diurnal + drift["temperature"]
+    
+    # Air plus humide quand il fait plus frais, vent plus fort l'après-midi
+    humidity = np.clip(62 - 2.5 * (temperature - base) + drift["humidity"], 10, 100)
+    pressure = 1013 + drift["pressure"]
+    wind_speed = np.clip(12 + 4 * diurnal + drift["wind_speed"], 0, None)
+    
+    # Condition météo : premier seuil d'humidité atteint
+    thresholds = np.array([threshold for threshold, *_ in CONDITIONS])
+    condition = np.argmax(humidity[:, None] >= thresholds[None, :], axis=1)
+    
+    return {
+        "timestamp": timestamps,
+        "temperature": np.round(temperature, 1),
+        "humidity": np.round(humidity).astype(int),
+        "pressure": np.round(pressure).astype(int),
+        "wind_speed": np.round(wind_speed, 1),
+        "condition": condition
+    }
+
+
+def generate_history(
+    cities: List[str],
+    days: float,
+    cadence_minutes: int = 10,
+    seed: Optional[int] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = SEED_BATCH_SIZE
+) -> Iterator[List[Dict]]:
+    """
+    Génère l'historique simulé, par lots de documents prêts à insérer.
+    
+    Args:
+        cities (List[str]): Villes à simuler
+        days (float): Durée de l'historique en jours
+        cadence_minutes (int): Intervalle entre deux relevés d'une ville
+        seed (Optional[int]): Graine aléatoire (même graine = même historique)
+        end (Optional[datetime]): Fin de l'historique (par défaut: maintenant)
+        batch_size (int): Nombre de documents par lot
+    
+    Yields:
+        List[Dict]: Lots de documents au format de WeatherService
+    """
+    rng = np.random.default_rng(seed)
+    
+    # Grille de temps commune, alignée sur la cadence
+    end = np.datetime64(end or datetime.now(), "m")
+    end -= end.astype(int) % cadence_minutes
+    n = round(days * 24 * 60 / cadence_minutes)
+    if n <= 0:
+        # Durée inférieure à un pas de la cadence : aucun relevé
+        return
+    timestamps = end - np.arange(n - 1, -1, -1) * np.timedelta64(cadence_minutes, "m")
+    python_timestamps = timestamps.astype("datetime64[us]").tolist()
+    
+    # Dérives de toutes les villes et mesures en un seul calcul : colonne = (mesure, ville)
+    std = np.repeat([std for std, _ in DRIFTS.values()], len(cities))
+    phi = np.repeat(
+        [np.exp(-cadence_minutes / (timescale * 60)) for _, timescale in DRIFTS.values()], len(cities)
+    )
+    drifts = _ar1(rng, n, std, phi).reshape(n, len(DRIFTS), len(cities))
+    
+    for c, city in enumerate(cities):
+        drift = {field: drifts[:, f, c] for f, field in enumerate(DRIFTS)}
+        columns = generate_city(city, timestamps, drift)
+        
+        # Conversion en types Python natifs (attendus par le pilote MongoDB)
+        temperatures = columns["temperature"].tolist()
+        humidities = columns["humidity"].tolist()
+        pressures = columns["pressure"].tolist()
+        wind_speeds = columns["wind_speed"].tolist()
+        conditions = columns["condition"].tolist()
+        
+        for start in range(0, n, batch_size):
+            stop = min(start + batch_size, n)
+            yield [
+                {
+                    "city": city,
+                    "timestamp": python_timestamps[i],
+                    "temperature": temperatures[i],
+                    "humidity": humidities[i],
+                    "pressure": pressures[i],
+                    "wind_speed": wind_speeds[i],
+                    "weather": CONDITIONS[conditions[i]][1],
+                    "description": CONDITIONS[conditions[i]][2],
+                    "icon": CONDITIONS[conditions[i]][3],
+                    "source": SOURCE_MOCK
+                }
+                for i in range(start, stop)
+            ]
+
+
+def seed_history(
+    db,
+    cities: List[str],
+    days: float,
+    cadence_minutes: int = 10,
+    seed: Optional[int] = None,
+    batch_size: int = SEED_BATCH_SIZE,
+    write_concern: Optional[str] = None
+) -> int:
+    """
+    Génère l'historique simulé et l'écrit dans la base par lots, sans mise à
+    jour des statistiques à chaque lot : elles sont recalculées une seule fois
+    par MongoDB à la fin (rebuild_rollups).
+    
+    Args:
+        db: Instance de WeatherDB
+        cities (List[str]): Villes à simuler
+        days (float): Durée de l'historique en jours
+        cadence_minutes (int): Intervalle entre deux relevés d'une ville
+        seed (Optional[int]): Graine aléatoire
+        batch_size (int): Nombre de documents par écriture groupée
+        write_concern (Optional[str]): Write concern des insertions (par défaut: MONGO_WRITE_CONCERN)
+    
+    Returns:
+        int: Nombre de documents insérés
+    """
+    inserted = 0
+    for batch in generate_history(cities, days, cadence_minutes, seed, batch_size=batch_size):
+        inserted += db.save_many(batch, write_concern=write_concern, rollups=False)["inserted"]
+    
+    db.rebuild_rollups()
+    return inserted
+
+
+# ============================================================================
+# LIGNE DE COMMANDE
+# ============================================================================
+
+if __name__ == "__main__":
+    from db import WeatherDB  # Gestionnaire de base de données MongoDB
+    
+    parser = argparse.ArgumentParser(description="Génération d'un historique météo simulé")
+    parser.add_argument("--days", type=float, default=30, help="Durée de l'historique en jours")
+    parser.add_argument("--cities", type=int, default=len(MOROCCAN_CITIES), help="Nombre de villes simulées")
+    parser.add_argument("--cadence", type=int, default=10, help="Minutes entre deux relevés")
+    parser.add_argument("--seed", type=int, default=None, help="Graine aléatoire")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE, help="Documents par écriture")
+    parser.add_argument("--write-concern", default=None, help="Write concern des insertions (ex: 0, 1, majority)")
+    parser.add_argument("--database", default=None, help="Base de données cible (par défaut: MONGO_DB_NAME)")
+    args = parser.parse_args()
+    
+    # Villes du dashboard, puis villes fictives au-delà des 32
+    cities = MOROCCAN_CITIES[:args.cities] + [
+        f"Ville {i + 1}" for i in range(max(0, args.cities - len(MOROCCAN_CITIES)))
+    ]
+    
+    db = WeatherDB(database=args.database, cache_size=0)
+    if not db.connect():
+        raise SystemExit(1)
+    
+    started = time.perf_counter()
+    count = seed_history(
+        db, cities, args.days, args.cadence, args.seed,
+        batch_size=args.batch_size, write_concern=args.write_concern
+    )
+    print(f"[OK] {count} relevés insérés pour {len(cities)} villes en {time.perf_counter() - started:.1f} s")
+    db.close()
@@ -6,149 +6,939 @@ Ce module supporte OpenWeatherMap et WeatherAPI avec un système de données sim
 """
 
 import os  # Pour accéder aux variables d'environnement
+import re  # Pour retirer les paramètres d'URL des messages d'erreur
+import json  # Pour lire et écrire les caches sur disque
+import time  # Pour mesurer la latence de chaque ville
+import threading  # Pour protéger le cache partagé entre les threads
 import requests  # Pour effectuer les requêtes HTTP vers les APIs météo
+from requests.adapters import HTTPAdapter  # Pour configurer le pool de connexions
+from urllib3.util.retry import Retry  # Pour les nouvelles tentatives avec backoff
+from concurrent.futures import ThreadPoolExecutor, wait  # Pour paralléliser les appels API
 from datetime import datetime  # Pour gérer les timestamps
-from typing import Dict, Optional  # Pour le typage des fonctions
+from typing import Dict, List, Optional, Tuple  # Pour le typage des fonctions
+from urllib.parse import urlparse  # Pour reconnaître le fournisseur d'une URL
 from dotenv import load_dotenv  # Pour charger les variables depuis le fichier .env
 
+from metrics import (  # Métriques d'exécution
+    CACHE_REQUESTS,
+    INGESTION_CITIES,
+    INGESTION_LATENCY,
+    MOCK_READINGS,
+    PROVIDER_LATENCY,
+    PROVIDER_RETRIES
+)
+from logging_config import get_logger  # Journalisation structurée
+from rate_limiter import create_rate_limiter  # Quotas d'appels par fournisseur
+
 # Charger les variables d'environnement depuis le fichier .env
 load_dotenv()
 
+# Journal du module (niveau réglable avec LOG_LEVELS=weather_service=...)
+logger = get_logger("weather_service")
+
+# Liste complète des villes marocaines - Couverture nationale du dashboard
+MOROCCAN_CITIES = [
+    # Grandes métropoles
+    "Casablanca",      # Capitale économique
+    "Rabat",           # Capitale administrative
+    "Marrakech",       # Ville impériale et touristique
+    "Fès",             # Ville impériale
+    "Tanger",          # Ville du détroit
+    "Agadir",          # Capitale du Souss
+    
+    # Villes impériales et régionales
+    "Meknès",          # Ville impériale
+    "Oujda",           # Capitale de l'Oriental
+    "Tétouan",         # Capitale du Nord
+    "Kenitra",         # Ville du Gharb
+    
+    # Villes côtières atlantiques
+    "Essaouira",       # Ville côtière artistique
+    "El Jadida",       # Ville côtière historique
+    "Safi",            # Port de pêche
+    "Mohammedia",      # Ville portuaire
+    "Larache",         # Ville côtière nord
+    "Asilah",          # Station balnéaire
+    
+    # Villes côtières méditerranéennes
+    "Nador",           # Ville du Rif oriental
+    "Al Hoceima",      # Perle de la Méditerranée
+    
+    # Villes de l'intérieur
+    "Béni Mellal",     # Capitale du Tadla
+    "Khouribga",       # Ville minière
+    "Taza",            # Porte de l'Oriental
+    "Khemisset",       # Ville du plateau central
+    "Settat",          # Ville agricole
+    
+    # Villes du Sud
+    "Laâyoune",        # Capitale des provinces du Sud
+    "Dakhla",          # Ville saharienne côtière
+    "Guelmim",         # Porte du désert
+    "Tan-Tan",         # Ville saharienne
+    "Taroudant",       # Petite Marrakech
+    "Ouarzazate",      # Porte du désert
+    
+    # Autres villes importantes
+    "Errachidia",      # Capitale du Tafilalet
+    "Ifrane",          # Petite Suisse marocaine
+    "Ksar El Kebir"    # Ville du Nord-Ouest
+]
+
+# Températures de base réalistes (°C) des villes marocaines, pour les données simulées
+BASE_TEMPERATURES = {
+    # Grandes métropoles
+    "Casablanca": 19,
+    "Rabat": 18,
+    "Marrakech": 22,
+    "Fès": 17,
+    "Tanger": 16,
+    "Agadir": 21,
+    
+    # Villes impériales et régionales
+    "Meknès": 16,
+    "Oujda": 15,
+    "Tétouan": 17,
+    "Kenitra": 18,
+    
+    # Villes côtières atlantiques
+    "Essaouira": 18,
+    "El Jadida": 19,
+    "Safi": 19,
+    "Mohammedia": 19,
+    "Larache": 17,
+    "Asilah": 17,
+    
+    # Villes côtières méditerranéennes
+    "Nador": 17,
+    "Al Hoceima": 18,
+    
+    # Villes de l'intérieur
+    "Béni Mellal": 18,
+    "Khouribga": 17,
+    "Taza": 16,
+    "Khemisset": 16,
+    "Settat": 18,
+    
+    # Villes du Sud
+    "Laâyoune": 22,
+    "Dakhla": 21,
+    "Guelmim": 23,
+    "Tan-Tan": 22,
+    "Taroudant": 21,
+    "Ouarzazate": 20,
+    
+    # Autres villes importantes
+    "Errachidia": 19,
+    "Ifrane": 12,  # Plus fraîche (montagne)
+    "Ksar El Kebir": 17
+}
+
+# Nombre maximal de villes récupérées simultanément
+DEFAULT_CONCURRENCY = int(os.getenv("INGESTION_CONCURRENCY", "8"))
+
+# Moteur de récupération individuelle : "threads" (pool de threads) ou "async"
+# (asyncio + httpx, voir async_weather_service.py, pour des centaines de lieux)
+INGESTION_ENGINE = os.getenv("INGESTION_ENGINE", "threads")
+
+# Durée maximale (en secondes) d'une mise à jour complète
+DEFAULT_DEADLINE = float(os.getenv("INGESTION_DEADLINE", "30"))
+
+# Délais (en secondes) pour établir la connexion et pour lire la réponse
+CONNECT_TIMEOUT = float(os.getenv("WEATHER_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("WEATHER_READ_TIMEOUT", "10"))
+
+# Nouvelles tentatives sur erreurs transitoires (quota dépassé, erreurs serveur)
+MAX_RETRIES = int(os.getenv("WEATHER_MAX_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("WEATHER_RETRY_BACKOFF", "0.5"))  # Délai de base du backoff exponentiel
+MAX_RETRY_AFTER = float(os.getenv("WEATHER_MAX_RETRY_AFTER", "30"))  # Attente maximale imposée par Retry-After
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# URL de base de l'API OpenWeatherMap
+OWM_BASE_URL = "http://api.openweathermap.org/data/2.5"
+
+# Endpoint WeatherAPI.com de la météo actuelle
+WEATHERAPI_URL = "http://api.weatherapi.com/v1/current.json"
+
+# Fournisseur correspondant à chaque hôte (pour les métriques des nouvelles tentatives)
+PROVIDER_HOSTS = {
+    urlparse(OWM_BASE_URL).hostname: "openweather",
+    urlparse(WEATHERAPI_URL).hostname: "weatherapi"
+}
+
+# Requêtes groupées OpenWeatherMap (endpoint /group, 20 villes maximum par appel)
+OWM_USE_GROUP = os.getenv("OWM_USE_GROUP", "true").lower() == "true"
+OWM_GROUP_SIZE = 20
+
+# Fichier où sont conservés les identifiants OpenWeatherMap des villes
+OWM_CITY_ID_CACHE = os.getenv("OWM_CITY_ID_CACHE", ".owm_city_ids.json")
+
+# Statuts possibles d'une ville à la fin d'une mise à jour
+STATUS_OK = "ok"  # Données réelles récupérées depuis l'API
+STATUS_MOCK = "mock"  # Données simulées (mode test ou repli après échec)
+STATUS_FAILED = "failed"  # Aucune donnée (erreur inattendue ou délai dépassé)
+STATUS_UNCHANGED = "unchanged"  # Relevé déjà sauvegardé (cache ou observation identique)
+
+# Durée (en secondes) pendant laquelle une réponse API est réutilisée sans nouvel appel
+# (OpenWeatherMap met ses observations à jour environ toutes les 10 minutes)
+RESPONSE_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+
+# Fichier de persistance du cache des réponses (vide = cache en mémoire uniquement)
+RESPONSE_CACHE_FILE = os.getenv("WEATHER_CACHE_FILE", "")
+
+# Fournisseurs pris en charge et variable d'environnement de leur clé API
+PROVIDER_KEYS = {
+    "openweather": "OPENWEATHER_API_KEY",
+    "weatherapi": "WEATHERAPI_API_KEY"
+}
+
+# Source des relevés simulés (champ "source" des documents)
+SOURCE_MOCK = "mock"
+
+# Disjoncteur : échecs consécutifs avant ouverture, et durée (s) avant un nouvel essai
+BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("CIRCUIT_BREAKER_RESET", "60"))
+
+class _CappedRetry(Retry):
+    """
+    Politique de nouvelles tentatives qui respecte l'en-tête Retry-After
+    sans jamais attendre plus de MAX_RETRY_AFTER secondes.
+    """
+    
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+    
+    def increment(self, *args, **kwargs) -> Retry:
+        # Lève MaxRetryError si les tentatives sont épuisées : seules les nouvelles tentatives sont comptées
+        retry = super().increment(*args, **kwargs)
+        pool = kwargs.get("_pool")
+        host = pool.host if pool is not None else None
+        PROVIDER_RETRIES.inc(provider=PROVIDER_HOSTS.get(host, host or "inconnu"))
+        return retry
+
+
+class ResponseCache:
+    """
+    Cache des réponses des fournisseurs météo, par (fournisseur, ville).
+    
+    - Une réponse plus récente que `ttl` est réutilisée sans appel API.
+    - L'ETag éventuel permet une requête conditionnelle (304 Not Modified).
+    - La date d'observation du dernier relevé sauvegardé (champ `dt` /
+      `last_updated` du fournisseur) évite d'enregistrer deux fois la même
+      observation.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, path: Optional[str] = None):
+        """
+        Args:
+            ttl (Optional[float]): Fraîcheur des réponses en secondes (par défaut: WEATHER_CACHE_TTL)
+            path (Optional[str]): Fichier de persistance (par défaut: WEATHER_CACHE_FILE, vide = aucun)
+        """
+        self.ttl = RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.path = RESPONSE_CACHE_FILE if path is None else path
+        
+        # (fournisseur, ville) -> {"data", "fetched_at", "etag"}
+        self._entries: Dict[tuple, Dict] = {}
+        # (fournisseur, ville) -> date d'observation du dernier relevé sauvegardé
+        self._observed: Dict[tuple, datetime] = {}
+        self._lock = threading.Lock()
+        
+        if self.path:
+            self._load()
+    
+    def get(self, provider: str, city: str) -> Optional[Dict]:
+        """
+        Retourne une copie de la réponse en cache si elle est encore fraîche.
+        """
+        entry = self._entries.get((provider, city))
+        if entry is None or time.time() - entry["fetched_at"] > self.ttl:
+            CACHE_REQUESTS.inc(cache="response", result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache="response", result="hit")
+        return dict(entry["data"])
+    
+    def peek(self, provider: str, city: str) -> bool:
+        """
+        Indique si une réponse fraîche est en cache, sans la compter comme
+        une lecture du cache (voir get).
+        """
+        entry = self._entries.get((provider, city))
+        return entry is not None and time.time() - entry["fetched_at"] <= self.ttl
+    
+    def etag(self, provider: str, city: str) -> Optional[str]:
+        """
+        Retourne l'ETag de la dernière réponse (fraîche ou non), s'il existe.
+        """
+        entry = self._entries.get((provider, city))
+        return entry["etag"] if entry else None
+    
+    def revalidate(self, provider: str, city: str) -> Optional[Dict]:
+        """
+        Prolonge la fraîcheur d'une réponse confirmée par le fournisseur (304)
+        et en retourne une copie.
+        """
+        with self._lock:
+            entry = self._entries.get((provider, city))
+            if entry is None:
+                return None
+            entry["fetched_at"] = time.time()
+            return dict(entry["data"])
+    
+    def set(self, provider: str, city: str, data: Dict, etag: Optional[str] = None):
+        """
+        Enregistre une réponse standardisée.
+        """
+        with self._lock:
+            self._entries[(provider, city)] = {
+                "data": dict(data),
+                "fetched_at": time.time(),
+                "etag": etag
+            }
+    
+    def is_new(self, provider: str, city: str, data: Dict) -> bool:
+        """
+        Indique si un relevé correspond à une observation pas encore sauvegardée.
+        Les relevés sans date d'observation (données simulées) sont toujours nouveaux.
+        """
+        observed_at = data.get("observed_at")
+        if observed_at is None:
+            return True
+        last = self._observed.get((provider, city))
+        return last is None or observed_at > last
+    
+    def mark_saved(self, provider: str, city: str, data: Dict):
+        """
+        Mémorise la date d'observation d'un relevé sauvegardé.
+        """
+        observed_at = data.get("observed_at")
+        if observed_at is not None:
+            with self._lock:
+                self._observed[(provider, city)] = observed_at
+    
+    def _load(self):
+        """
+        Charge le cache depuis le fichier de persistance.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                content = json.load(f)
+            for key, entry in content.get("responses", {}).items():
+                provider, city = key.split("|", 1)
+                data = entry["data"]
+                for field in ("timestamp", "observed_at"):
+                    if data.get(field):
+                        data[field] = datetime.fromisoformat(data[field])
+                self._entries[(provider, city)] = entry
+            for key, observed_at in content.get("observed", {}).items():
+                provider, city = key.split("|", 1)
+                self._observed[(provider, city)] = datetime.fromisoformat(observed_at)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Cache des réponses illisible", extra={"path": self.path, "error": str(e)})
+    
+    def save(self):
+        """
+        Écrit le cache dans le fichier de persistance (sans effet si aucun n'est configuré).
+        """
+        if not self.path:
+            return
+        
+        with self._lock:
+            content = {
+                "responses": {f"{provider}|{city}": entry for (provider, city), entry in self._entries.items()},
+                "observed": {
+                    f"{provider}|{city}": observed_at.isoformat()
+                    for (provider, city), observed_at in self._observed.items()
+                }
+            }
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(content, f, ensure_ascii=False, default=datetime.isoformat)
+            except OSError as e:
+                logger.error("Impossible d'écrire le cache des réponses", extra={"path": self.path, "error": str(e)})
+
+
+class ProviderFailure(Exception):
+    """
+    Échec imputable au fournisseur (réseau, délai dépassé, erreur 5xx) :
+    seul ce type d'échec est compté par son disjoncteur.
+    """
+
+
+def _is_provider_failure(error: Exception) -> bool:
+    """
+    Indique si une erreur HTTP (requests ou httpx) est imputable au fournisseur :
+    erreur de transport (pas de réponse) ou réponse 5xx. Une erreur 4xx (ville
+    inconnue, clé refusée...) concerne la requête, pas la disponibilité du service.
+    """
+    response = getattr(error, "response", None)
+    return response is None or response.status_code >= 500
+
+
+def _error_fields(error: Exception) -> Dict:
+    """
+    Champs de journal d'une erreur HTTP (requests ou httpx) : classe, code de
+    statut et message sans paramètres d'URL, qui contiennent la clé API
+    (appid=... pour OpenWeatherMap, key=... pour WeatherAPI).
+    """
+    response = getattr(error, "response", None)
+    return {
+        "error": type(error).__name__,
+        "status": response.status_code if response is not None else None,
+        "detail": re.sub(r"\?[^\s'\"]*", "", str(error))
+    }
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur d'un fournisseur météo.
+    
+    - fermé : les appels passent ;
+    - ouvert (après `threshold` échecs consécutifs) : les appels échouent
+      immédiatement, sans attendre le délai d'expiration ;
+    - semi-ouvert (après `reset_timeout` secondes) : un seul appel d'essai
+      passe ; son succès referme le disjoncteur, son échec le rouvre.
+    """
+    
+    def __init__(self, name: str, threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        """
+        Args:
+            name (str): Nom du fournisseur (pour les messages)
+            threshold (Optional[int]): Échecs consécutifs avant ouverture (par défaut: CIRCUIT_BREAKER_THRESHOLD)
+            reset_timeout (Optional[float]): Secondes avant un appel d'essai (par défaut: CIRCUIT_BREAKER_RESET)
+        """
+        self.name = name
+        self.threshold = threshold or BREAKER_THRESHOLD
+        self.reset_timeout = BREAKER_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        
+        self.failures = 0  # Échecs consécutifs
+        self.opened_at: Optional[float] = None  # Date d'ouverture (None = fermé)
+        self._trial_running = False  # Appel d'essai en cours (semi-ouvert)
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        """
+        Indique si le disjoncteur est ouvert ou semi-ouvert.
+        """
+        return self.opened_at is not None
+    
+    def allow(self) -> bool:
+        """
+        Indique si un appel peut être tenté maintenant.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Semi-ouvert : laisser passer un seul appel d'essai
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+    
+    def record_success(self):
+        """
+        Enregistre un appel réussi : le disjoncteur se referme.
+        """
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Fournisseur rétabli", extra={"provider": self.name})
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+    
+    def record_failure(self):
+        """
+        Enregistre un appel échoué : le disjoncteur s'ouvre au-delà du seuil.
+        """
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or (self.opened_at is None and self.failures >= self.threshold):
+                logger.error(
+                    "Fournisseur indisponible, appels suspendus",
+                    extra={"provider": self.name, "failures": self.failures, "reset_s": self.reset_timeout}
+                )
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+    
+    def record_outcome(self, succeeded: bool, provider_failed: bool):
+        """
+        Enregistre le résultat d'un appel autorisé par allow(). Un appel ni
+        réussi ni en échec côté fournisseur (quota local épuisé, ville inconnue,
+        réponse inattendue, erreur interne) ne compte pas comme un échec, mais
+        libère l'appel d'essai éventuel.
+        
+        Args:
+            succeeded (bool): Données obtenues
+            provider_failed (bool): Échec imputable au fournisseur (ProviderFailure)
+        """
+        if succeeded:
+            self.record_success()
+        elif provider_failed:
+            self.record_failure()
+        else:
+            with self._lock:
+                self._trial_running = False
+
+
+def _create_session(pool_size: int) -> requests.Session:
+    """
+    Crée une session HTTP persistante (keep-alive) avec pool de connexions.
+    Les erreurs transitoires (429, 5xx, coupures réseau) sont retentées avec
+    un backoff exponentiel et une part d'aléatoire (jitter).
+    
+    Args:
+        pool_size (int): Nombre de connexions conservées par hôte
+        
+    Returns:
+        requests.Session: Session prête à être partagée entre les threads
+    """
+    retry = _CappedRetry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        backoff_jitter=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False  # Laisser raise_for_status() signaler l'erreur finale
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 class WeatherService:
     """
     Service de récupération des données météorologiques.
-    Gère les appels API vers OpenWeatherMap ou WeatherAPI.
+    Gère les appels API vers OpenWeatherMap ou WeatherAPI : le fournisseur
+    configuré est utilisé en priorité, l'autre (si sa clé est configurée)
+    prend le relais lorsqu'il est en panne.
     """
     
-    def __init__(self):
+    def __init__(self, pool_size: Optional[int] = None, response_cache: Optional[ResponseCache] = None):
         """
         Initialise le service météo avec les identifiants API.
         Charge la clé API et le fournisseur depuis les variables d'environnement.
-        """
-        # Récupérer la clé API depuis le fichier .env
-        self.api_key = os.getenv("WEATHER_API_KEY", "")
         
-        # Récupérer le fournisseur API (openweather ou weatherapi)
+        Args:
+            pool_size (Optional[int]): Taille du pool de connexions HTTP
+                                       (par défaut: INGESTION_CONCURRENCY)
+            response_cache (Optional[ResponseCache]): Cache des réponses API
+                                                      (par défaut: un cache configuré par l'environnement)
+        """
+        # Récupérer le fournisseur API principal (openweather ou weatherapi)
         self.provider = os.getenv("WEATHER_API_PROVIDER", "openweather")
         
+        # Clé API de chaque fournisseur ; WEATHER_API_KEY reste la clé du fournisseur principal
+        self.api_keys = {
+            provider: os.getenv(variable, "")
+            for provider, variable in PROVIDER_KEYS.items()
+        }
+        if self.provider in self.api_keys and not self.api_keys[self.provider]:
+            self.api_keys[self.provider] = os.getenv("WEATHER_API_KEY", "")
+        self.api_key = self.api_keys.get(self.provider, "")
+        
+        # Fournisseurs utilisables, par ordre de priorité (le principal d'abord)
+        if self.provider not in PROVIDER_KEYS:
+            logger.error("Fournisseur inconnu", extra={"provider": self.provider})
+        self.providers = sorted(
+            (provider for provider, key in self.api_keys.items() if key),
+            key=lambda provider: provider != self.provider
+        )
+        
+        # Session HTTP persistante réutilisée par tous les appels
+        self.session = _create_session(pool_size or DEFAULT_CONCURRENCY)
+        
+        # Identifiants OpenWeatherMap des villes (nom -> id), chargés depuis le disque
+        self._city_ids_lock = threading.Lock()
+        self.city_ids = self._load_city_ids()
+        
+        # Réponses récentes par (fournisseur, ville)
+        self.response_cache = response_cache or ResponseCache()
+        
+        # Quotas d'appels et disjoncteur de chaque fournisseur
+        self.rate_limiters = {
+            provider: create_rate_limiter(provider, self.api_keys[provider])
+            for provider in self.providers
+        }
+        self.breakers = {provider: CircuitBreaker(provider) for provider in self.providers}
+        
     def fetch_weather(self, city: str) -> Optional[Dict]:
         """
         Récupère les données météo actuelles pour une ville.
+        Une réponse encore fraîche dans le cache est réutilisée sans appel API.
+        Les fournisseurs sont essayés par ordre de priorité ; un fournisseur
+        dont le disjoncteur est ouvert est ignoré sans attendre.
         
         Args:
             city (str): Nom de la ville (ex: "Casablanca", "Rabat")
             
         Returns:
-            Optional[Dict]: Dictionnaire avec les données météo standardisées ou None en cas d'erreur
+            Optional[Dict]: Dictionnaire avec les données météo standardisées
+                            (champ "source" = fournisseur) ou None si aucun n'a répondu
         """
-        # Vérifier quel fournisseur API utiliser
-        if self.provider == "openweather":
-            return self._fetch_openweather(city)
-        elif self.provider == "weatherapi":
-            return self._fetch_weatherapi(city)
-        else:
-            print(f"[ERREUR] Fournisseur inconnu: {self.provider}")
-            return None
+        for provider in self.providers:
+            # Réponse récente déjà en cache : pas d'appel API
+            cached = self.response_cache.get(provider, city)
+            if cached is not None:
+                return cached
+            
+            # Fournisseur en panne : passer au suivant immédiatement
+            breaker = self.breakers[provider]
+            if not breaker.allow():
+                continue
+            
+            data, provider_failed = None, False
+            try:
+                data = self._fetch_from(provider, city)
+            except ProviderFailure:
+                provider_failed = True
+            finally:
+                # Toujours conclure l'appel : un essai semi-ouvert ne reste jamais en cours
+                breaker.record_outcome(bool(data), provider_failed)
+            
+            if data:
+                if provider != self.provider:
+                    logger.info("Ville récupérée via le fournisseur de secours", extra={"city": city, "provider": provider})
+                return data
+        
+        return None
     
-    def _fetch_openweather(self, city: str) -> Optional[Dict]:
+    def _build_request(self, provider: str, city: str) -> Tuple[str, Dict]:
         """
-        Récupère les données depuis l'API OpenWeatherMap.
+        Construit la requête individuelle d'une ville pour un fournisseur
+        (partagée avec async_weather_service.AsyncWeatherService).
         
         Args:
+            provider (str): Fournisseur ("openweather" ou "weatherapi")
             city (str): Nom de la ville
             
         Returns:
-            Optional[Dict]: Données météo standardisées ou None
+            Tuple[str, Dict]: URL et paramètres de la requête
         """
-        try:
+        if provider == "openweather":
             # URL de l'API OpenWeatherMap pour la météo actuelle
-            url = "http://api.openweathermap.org/data/2.5/weather"
-            
-            # Paramètres de la requête
-            params = {
+            return f"{OWM_BASE_URL}/weather", {
                 "q": city,  # Nom de la ville
-                "appid": self.api_key,  # Clé API
+                "appid": self.api_keys["openweather"],  # Clé API
                 "units": "metric",  # Unités métriques (Celsius, km/h)
                 "lang": "fr"  # Langue française pour les descriptions
             }
+        
+        # URL de l'API WeatherAPI pour la météo actuelle
+        return WEATHERAPI_URL, {
+            "key": self.api_keys["weatherapi"],  # Clé API
+            "q": city,  # Nom de la ville
+            "aqi": "no",  # Ne pas inclure l'indice de qualité de l'air
+            "lang": "fr"  # Langue française
+        }
+    
+    def _parse_response(self, provider: str, city: str, data: Dict, etag: Optional[str] = None) -> Dict:
+        """
+        Standardise la réponse individuelle d'un fournisseur et l'enregistre
+        dans le cache des réponses.
+        
+        Args:
+            provider (str): Fournisseur ayant répondu
+            city (str): Nom de la ville
+            data (Dict): Réponse JSON de l'API
+            etag (Optional[str]): En-tête ETag de la réponse
+            
+        Returns:
+            Dict: Données météo standardisées
+        """
+        if provider == "openweather":
+            # Mémoriser l'identifiant de la ville pour les requêtes groupées suivantes
+            if "id" in data:
+                self._remember_city_id(city, data["id"])
+            result = self._standardize_openweather(city, data)
+        else:
+            result = self._standardize_weatherapi(city, data)
+        
+        self.response_cache.set(provider, city, result, etag)
+        return result
+    
+    def _fetch_from(self, provider: str, city: str) -> Optional[Dict]:
+        """
+        Récupère les données d'une ville auprès d'un fournisseur.
+        
+        Args:
+            provider (str): Fournisseur ("openweather" ou "weatherapi")
+            city (str): Nom de la ville
+            
+        Returns:
+            Optional[Dict]: Données météo standardisées ou None
+        
+        Raises:
+            ProviderFailure: Erreur réseau, délai dépassé ou réponse 5xx
+        """
+        start = None
+        outcome = "error"
+        try:
+            url, params = self._build_request(provider, city)
+            
+            # Respecter le quota du fournisseur
+            if not self._acquire_call(provider, city):
+                return None
             
-            # Effectuer la requête HTTP GET avec un timeout de 10 secondes
-            response = requests.get(url, params=params, timeout=10)
+            # Effectuer la requête HTTP GET via la session (connexion réutilisée),
+            # conditionnelle si une réponse précédente a fourni un ETag
+            start = time.perf_counter()
+            response = self.session.get(
+                url, params=params, headers=self._conditional_headers(provider, city),
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            )
+            
+            # Données inchangées depuis la réponse en cache
+            if response.status_code == 304:
+                outcome = "not_modified"
+                return self.response_cache.revalidate(provider, city)
             
             # Vérifier si la requête a réussi (code 200)
             response.raise_for_status()
             
-            # Convertir la réponse JSON en dictionnaire Python
-            data = response.json()
-            
-            # Standardiser la réponse dans un format uniforme
-            return {
-                "city": city,  # Nom de la ville
-                "timestamp": datetime.now(),  # Horodatage actuel
-                "temperature": data["main"]["temp"],  # Température en °C
-                "humidity": data["main"]["humidity"],  # Humidité en %
-                "pressure": data["main"]["pressure"],  # Pression en hPa
-                "wind_speed": data["wind"]["speed"] * 3.6,  # Convertir m/s en km/h
-                "weather": data["weather"][0]["main"],  # Condition principale (Clear, Rain, etc.)
-                "description": data["weather"][0]["description"],  # Description détaillée
-                "icon": data["weather"][0]["icon"]  # Code de l'icône météo
-            }
+            # Standardiser la réponse JSON dans un format uniforme
+            result = self._parse_response(provider, city, response.json(), response.headers.get("ETag"))
+            outcome = "ok"
+            return result
             
         except requests.exceptions.RequestException as e:
             # Erreur lors de la requête HTTP (timeout, connexion, etc.)
-            print(f"[ERREUR] Échec de la requête API pour {city}: {e}")
+            logger.error(
+                "Échec de la requête API", extra={"city": city, "provider": provider, **_error_fields(e)}
+            )
+            if _is_provider_failure(e):
+                raise ProviderFailure(provider) from e
             return None
-        except KeyError as e:
+        except (KeyError, IndexError, TypeError, ValueError) as e:
             # Erreur si la structure de la réponse est inattendue
-            print(f"[ERREUR] Format de réponse API inattendu: {e}")
+            logger.error(
+                "Format de réponse API inattendu", extra={"city": city, "provider": provider, "error": str(e)}
+            )
             return None
+        finally:
+            # Durée de la requête (appels annulés faute de quota exclus)
+            if start is not None:
+                PROVIDER_LATENCY.observe(
+                    time.perf_counter() - start, provider=provider, kind="city", outcome=outcome
+                )
     
-    def _fetch_weatherapi(self, city: str) -> Optional[Dict]:
+    @staticmethod
+    def _standardize_openweather(city: str, data: Dict) -> Dict:
         """
-        Récupère les données depuis l'API WeatherAPI.com.
+        Convertit une réponse OpenWeatherMap (individuelle ou élément de /group)
+        dans le format standardisé attendu par save_weather_data.
         
         Args:
             city (str): Nom de la ville
+            data (Dict): Réponse JSON de l'API pour cette ville
             
         Returns:
-            Optional[Dict]: Données météo standardisées ou None
+            Dict: Données météo standardisées
         """
-        try:
-            # URL de l'API WeatherAPI pour la météo actuelle
-            url = "http://api.weatherapi.com/v1/current.json"
+        return {
+            "city": city,  # Nom de la ville
+            "timestamp": datetime.now(),  # Horodatage actuel
+            "observed_at": datetime.fromtimestamp(data["dt"]),  # Date de l'observation chez le fournisseur
+            "temperature": data["main"]["temp"],  # Température en °C
+            "humidity": data["main"]["humidity"],  # Humidité en %
+            "pressure": data["main"]["pressure"],  # Pression en hPa
+            "wind_speed": data["wind"]["speed"] * 3.6,  # Convertir m/s en km/h
+            "weather": data["weather"][0]["main"],  # Condition principale (Clear, Rain, etc.)
+            "description": data["weather"][0]["description"],  # Description détaillée
+            "icon": data["weather"][0]["icon"],  # Code de l'icône météo
+            "source": "openweather"  # Fournisseur ayant fourni le relevé
+        }
+    
+    @staticmethod
+    def _standardize_weatherapi(city: str, data: Dict) -> Dict:
+        """
+        Convertit une réponse WeatherAPI.com dans le format standardisé.
+        
+        Args:
+            city (str): Nom de la ville
+            data (Dict): Réponse JSON de l'API pour cette ville
+            
+        Returns:
+            Dict: Données météo standardisées
+        """
+        return {
+            "city": city,
+            "timestamp": datetime.now(),
+            "observed_at": datetime.fromtimestamp(data["current"]["last_updated_epoch"]),
+            "temperature": data["current"]["temp_c"],  # Température en Celsius
+            "humidity": data["current"]["humidity"],
+            "pressure": data["current"]["pressure_mb"],  # Pression en millibars
+            "wind_speed": data["current"]["wind_kph"],  # Vitesse du vent en km/h
+            "weather": data["current"]["condition"]["text"],
+            "description": data["current"]["condition"]["text"],
+            "icon": data["current"]["condition"]["icon"],
+            "source": "weatherapi"
+        }
+    
+    def group_chunks(self, cities: List[str]) -> List[List[str]]:
+        """
+        Découpe les villes en lots pour l'endpoint groupé d'OpenWeatherMap.
+        Seules les villes dont l'identifiant est déjà connu sont retenues ;
+        les autres doivent passer par une requête individuelle (qui enregistre
+        leur identifiant pour les mises à jour suivantes).
+        
+        Args:
+            cities (List[str]): Liste des noms de villes
+            
+        Returns:
+            List[List[str]]: Lots d'au plus OWM_GROUP_SIZE villes (vide si non applicable)
+        """
+        # Seulement si OpenWeatherMap est le fournisseur principal et répond
+        if self.provider != "openweather" or not OWM_USE_GROUP or "openweather" not in self.providers:
+            return []
+        if self.breakers["openweather"].is_open:
+            return []
+        
+        # Les villes dont la réponse en cache est fraîche n'ont pas besoin d'appel
+        known = [
+            city for city in cities
+            if city in self.city_ids and not self.response_cache.peek("openweather", city)
+        ]
+        return [known[i:i + OWM_GROUP_SIZE] for i in range(0, len(known), OWM_GROUP_SIZE)]
+    
+    def fetch_weather_group(self, cities: List[str]) -> Dict[str, Dict]:
+        """
+        Récupère plusieurs villes en une seule requête OpenWeatherMap (/group).
+        
+        Args:
+            cities (List[str]): Au plus OWM_GROUP_SIZE villes dont l'identifiant est connu
             
-            # Paramètres de la requête
+        Returns:
+            Dict[str, Dict]: Données standardisées par ville (vide en cas d'erreur)
+        """
+        # Correspondance identifiant -> nom pour répartir la réponse
+        names_by_id = {self.city_ids[city]: city for city in cities}
+        
+        # Une requête groupée ne consomme qu'un seul appel du quota
+        if not self._acquire_call("openweather", f"{len(cities)} villes"):
+            return {}
+        
+        breaker = self.breakers["openweather"]
+        start = time.perf_counter()
+        outcome = "error"
+        try:
             params = {
-                "key": self.api_key,  # Clé API
-                "q": city,  # Nom de la ville
-                "aqi": "no",  # Ne pas inclure l'indice de qualité de l'air
-                "lang": "fr"  # Langue française
+                "id": ",".join(str(city_id) for city_id in names_by_id),
+                "appid": self.api_keys["openweather"],
+                "units": "metric",
+                "lang": "fr"
             }
-            
-            # Effectuer la requête HTTP GET
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(
+                f"{OWM_BASE_URL}/group", params=params, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            )
             response.raise_for_status()
-            data = response.json()
             
-            # Standardiser la réponse
-            return {
-                "city": city,
-                "timestamp": datetime.now(),
-                "temperature": data["current"]["temp_c"],  # Température en Celsius
-                "humidity": data["current"]["humidity"],
-                "pressure": data["current"]["pressure_mb"],  # Pression en millibars
-                "wind_speed": data["current"]["wind_kph"],  # Vitesse du vent en km/h
-                "weather": data["current"]["condition"]["text"],
-                "description": data["current"]["condition"]["text"],
-                "icon": data["current"]["condition"]["icon"]
-            }
+            # Répartir la liste renvoyée par ville
+            result = {}
+            for item in response.json()["list"]:
+                city = names_by_id.get(item["id"])
+                if city:
+                    result[city] = self._standardize_openweather(city, item)
+                    self.response_cache.set("openweather", city, result[city])
+            breaker.record_success()
+            outcome = "ok"
+            return result
             
         except requests.exceptions.RequestException as e:
-            print(f"[ERREUR] Échec de la requête API pour {city}: {e}")
-            return None
-        except KeyError as e:
-            print(f"[ERREUR] Format de réponse API inattendu: {e}")
-            return None
+            logger.error(
+                "Échec de la requête groupée",
+                extra={"provider": "openweather", "cities": len(cities), **_error_fields(e)}
+            )
+            if _is_provider_failure(e):
+                breaker.record_failure()
+            return {}
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.error(
+                "Format de réponse API inattendu",
+                extra={"provider": "openweather", "cities": len(cities), "error": str(e)}
+            )
+            return {}
+        finally:
+            PROVIDER_LATENCY.observe(
+                time.perf_counter() - start, provider="openweather", kind="group", outcome=outcome
+            )
+    
+    def _acquire_call(self, provider: str, target: str) -> bool:
+        """
+        Réserve un appel dans le quota du fournisseur (en attendant si nécessaire).
+        
+        Args:
+            provider (str): Fournisseur appelé
+            target (str): Ville ou lot concerné (pour le message d'erreur)
+            
+        Returns:
+            bool: True si l'appel peut être effectué
+        """
+        if self.rate_limiters[provider].acquire():
+            return True
+        logger.error("Quota atteint, appel annulé", extra={"provider": provider, "target": target})
+        return False
+    
+    def _conditional_headers(self, provider: str, city: str) -> Dict[str, str]:
+        """
+        En-têtes d'une requête conditionnelle : If-None-Match avec l'ETag de la
+        dernière réponse, pour que le fournisseur réponde 304 si rien n'a changé.
+        """
+        etag = self.response_cache.etag(provider, city)
+        return {"If-None-Match": etag} if etag else {}
+    
+    def _load_city_ids(self) -> Dict[str, int]:
+        """
+        Charge les identifiants OpenWeatherMap depuis le fichier de cache.
+        
+        Returns:
+            Dict[str, int]: Correspondance nom de ville -> identifiant (vide si absent)
+        """
+        try:
+            with open(OWM_CITY_ID_CACHE, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error("Cache des identifiants illisible", extra={"path": OWM_CITY_ID_CACHE, "error": str(e)})
+            return {}
+    
+    def _remember_city_id(self, city: str, city_id: int):
+        """
+        Enregistre l'identifiant d'une ville et met à jour le fichier de cache.
+        
+        Args:
+            city (str): Nom de la ville
+            city_id (int): Identifiant OpenWeatherMap de la ville
+        """
+        with self._city_ids_lock:
+            if self.city_ids.get(city) == city_id:
+                return
+            self.city_ids[city] = city_id
+            try:
+                with open(OWM_CITY_ID_CACHE, "w", encoding="utf-8") as f:
+                    json.dump(self.city_ids, f, ensure_ascii=False, indent=2)
+            except OSError as e:
+                logger.error(
+                    "Impossible d'écrire le cache des identifiants",
+                    extra={"path": OWM_CITY_ID_CACHE, "error": str(e)}
+                )
+    
+    def close(self):
+        """
+        Ferme la session HTTP et libère les connexions du pool.
+        Le cache des réponses est écrit sur disque s'il est persistant.
+        """
+        self.response_cache.save()
+        self.session.close()
     
     def generate_mock_data(self, city: str) -> Dict:
         """
@@ -163,57 +953,8 @@ class WeatherService:
         """
         import random  # Pour générer des valeurs aléatoires
         
-        # Températures de base réalistes pour les villes marocaines
-        base_temps = {
-            # Grandes métropoles
-            "Casablanca": 19,
-            "Rabat": 18,
-            "Marrakech": 22,
-            "Fès": 17,
-            "Tanger": 16,
-            "Agadir": 21,
-            
-            # Villes impériales et régionales
-            "Meknès": 16,
-            "Oujda": 15,
-            "Tétouan": 17,
-            "Kenitra": 18,
-            
-            # Villes côtières atlantiques
-            "Essaouira": 18,
-            "El Jadida": 19,
-            "Safi": 19,
-            "Mohammedia": 19,
-            "Larache": 17,
-            "Asilah": 17,
-            
-            # Villes côtières méditerranéennes
-            "Nador": 17,
-            "Al Hoceima": 18,
-            
-            # Villes de l'intérieur
-            "Béni Mellal": 18,
-            "Khouribga": 17,
-            "Taza": 16,
-            "Khemisset": 16,
-            "Settat": 18,
-            
-            # Villes du Sud
-            "Laâyoune": 22,
-            "Dakhla": 21,
-            "Guelmim": 23,
-            "Tan-Tan": 22,
-            "Taroudant": 21,
-            "Ouarzazate": 20,
-            
-            # Autres villes importantes
-            "Errachidia": 19,
-            "Ifrane": 12,  # Plus fraîche (montagne)
-            "Ksar El Kebir": 17
-        }
-        
         # Obtenir la température de base ou utiliser 20°C par défaut
-        base_temp = base_temps.get(city, 20)
+        base_temp = BASE_TEMPERATURES.get(city, 20)
         
         # Générer des données aléatoires mais réalistes
         return {
@@ -237,41 +978,288 @@ class WeatherService:
                 "pluie légère",
                 "brume"
             ]),
-            "icon": "01d"  # Icône par défaut
+            "icon": "01d",  # Icône par défaut
+            "source": SOURCE_MOCK  # Relevé simulé, signalé comme tel dans l'interface
         }
 
 
-def update_weather_data(cities: list, db, use_mock: bool = False):
+def _city_result(service: WeatherService, city: str, data: Optional[Dict], latency: float) -> Dict:
+    """
+    Construit le résultat d'une ville à partir des données récupérées :
+    observation déjà sauvegardée, nouvelle observation, ou repli sur des
+    données simulées si aucun fournisseur n'a répondu.
+    
+    Args:
+        service (WeatherService): Service météo (cache des réponses, données simulées)
+        city (str): Nom de la ville
+        data (Optional[Dict]): Données standardisées, ou None en cas d'échec
+        latency (float): Durée de la récupération en secondes
+        
+    Returns:
+        Dict: Résultat avec la ville, le statut, la source, la latence (s) et les données
+    """
+    source = data["source"] if data else None
+    fields = {"city": city, "provider": source, "latency_ms": round(latency * 1000, 1)}
+    if data and not service.response_cache.is_new(data["source"], city, data):
+        # Observation déjà sauvegardée : rien à écrire
+        status = STATUS_UNCHANGED
+        logger.debug("Aucune nouvelle observation", extra={**fields, "outcome": status})
+        data = None
+    elif data:
+        status = STATUS_OK
+        logger.debug("Météo récupérée", extra={**fields, "outcome": status, "temperature": data["temperature"]})
+    else:
+        # Dernier recours, après tous les fournisseurs : données simulées (source "mock")
+        status = STATUS_MOCK
+        logger.warning("Aucun fournisseur disponible, données simulées", extra={**fields, "outcome": status})
+        MOCK_READINGS.inc(reason="no_provider")
+        data = service.generate_mock_data(city)
+        source = data["source"]
+    
+    # Source de l'observation, y compris inchangée (data vidé ci-dessus)
+    return {
+        "city": city,
+        "status": status,
+        "source": source,
+        "latency": latency,
+        "data": data
+    }
+
+
+def _fetch_city(service: WeatherService, city: str, use_mock: bool) -> Dict:
+    """
+    Récupère les données d'une ville et mesure la latence de l'opération.
+    Exécutée dans un thread du pool d'ingestion.
+    
+    Args:
+        service (WeatherService): Service météo partagé entre les threads
+        city (str): Nom de la ville
+        use_mock (bool): Si True, utilise des données simulées au lieu de l'API
+        
+    Returns:
+        Dict: Résultat avec la ville, le statut, la source, la latence (s) et les données
+    """
+    start = time.perf_counter()
+    
+    # Vérifier si on utilise des données simulées ou réelles
+    if use_mock or not service.providers:
+        # Générer des données simulées
+        data = service.generate_mock_data(city)
+        latency = time.perf_counter() - start
+        logger.debug(
+            "Données simulées générées",
+            extra={"city": city, "provider": data["source"], "latency_ms": round(latency * 1000, 1), "outcome": STATUS_MOCK}
+        )
+        MOCK_READINGS.inc(reason="mock_mode" if use_mock else "no_api_key")
+        return {
+            "city": city,
+            "status": STATUS_MOCK,
+            "source": data["source"],
+            "latency": latency,
+            "data": data
+        }
+    
+    # Récupérer les données réelles depuis l'API (ou le cache des réponses)
+    data = service.fetch_weather(city)
+    return _city_result(service, city, data, time.perf_counter() - start)
+
+
+def _fetch_group(service: WeatherService, cities: List[str]) -> List[Dict]:
+    """
+    Récupère un lot de villes via une requête groupée et mesure sa latence.
+    Les villes absentes de la réponse ne figurent pas dans le résultat.
+    
+    Args:
+        service (WeatherService): Service météo partagé entre les threads
+        cities (List[str]): Lot de villes (identifiants connus)
+        
+    Returns:
+        List[Dict]: Un résultat par ville récupérée (même format que _fetch_city)
+    """
+    start = time.perf_counter()
+    fetched = service.fetch_weather_group(cities)
+    latency = time.perf_counter() - start
+    
+    results = []
+    for city, data in fetched.items():
+        result = {"city": city, "status": STATUS_OK, "source": data["source"], "latency": latency, "data": data}
+        if not service.response_cache.is_new(data["source"], city, data):
+            result.update(status=STATUS_UNCHANGED, data=None)
+        logger.debug(
+            "Météo récupérée (requête groupée)",
+            extra={
+                "city": city,
+                "provider": data["source"],
+                "latency_ms": round(latency * 1000, 1),
+                "outcome": result["status"]
+            }
+        )
+        results.append(result)
+    return results
+
+
+def update_weather_data(
+    cities: list,
+    db,
+    use_mock: bool = False,
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None,
+    service: Optional[WeatherService] = None,
+    engine: Optional[str] = None
+) -> List[Dict]:
     """
     Récupère et sauvegarde les données météo pour plusieurs villes.
     Cette fonction est appelée pour mettre à jour la base de données.
     
+    Les villes sont récupérées en parallèle dans un pool de threads borné :
+    la durée totale dépend de la ville la plus lente et non de la somme
+    de toutes les villes. Les villes non terminées à l'échéance sont
+    marquées en échec.
+    
+    Avec OpenWeatherMap, les villes dont l'identifiant est connu sont d'abord
+    récupérées par lots de 20 (requêtes groupées) ; seules les autres font
+    l'objet d'une requête individuelle.
+    
+    Les réponses encore fraîches sont servies par le cache du service, et une
+    observation déjà sauvegardée n'est pas réécrite (statut "unchanged").
+    
+    Si le fournisseur principal est en panne, son disjoncteur s'ouvre et les
+    villes suivantes passent directement au fournisseur de secours ; les
+    données simulées ne sont utilisées qu'en dernier recours (statut "mock",
+    source "mock").
+    
+    Avec le moteur "async", les requêtes individuelles passent par
+    AsyncWeatherService (une boucle asyncio, ASYNC_CONCURRENCY requêtes
+    simultanées) au lieu du pool de threads.
+    
     Args:
         cities (list): Liste des noms de villes
         db: Instance de la base de données MongoDB
         use_mock (bool): Si True, utilise des données simulées au lieu de l'API
+        max_workers (Optional[int]): Nombre de requêtes simultanées (par défaut: INGESTION_CONCURRENCY)
+        deadline (Optional[float]): Durée maximale en secondes (par défaut: INGESTION_DEADLINE)
+        service (Optional[WeatherService]): Service à réutiliser entre deux mises à jour
+                                            (par défaut: un service créé puis fermé ici)
+        engine (Optional[str]): "threads" ou "async" (par défaut: INGESTION_ENGINE)
+        
+    Returns:
+        List[Dict]: Un résultat par ville, dans l'ordre de `cities`
+                    Exemple: {"city": "Rabat", "status": "ok", "source": "openweather",
+                              "latency": 0.42, "saved": True}
     """
-    # Créer une instance du service météo
-    service = WeatherService()
-    
-    # Parcourir chaque ville
-    for city in cities:
-        # Vérifier si on utilise des données simulées ou réelles
-        if use_mock or not service.api_key:
-            # Générer des données simulées
-            data = service.generate_mock_data(city)
-            print(f"[MOCK] Données simulées générées pour {city}")
-        else:
-            # Récupérer les données réelles depuis l'API
-            data = service.fetch_weather(city)
-            
-            if data:
-                print(f"[OK] Météo récupérée pour {city}: {data['temperature']}°C")
-            else:
-                # En cas d'échec, utiliser des données simulées
-                print(f"[ERREUR] Échec de récupération pour {city}, utilisation de données simulées")
-                data = service.generate_mock_data(city)
+    max_workers = max_workers or DEFAULT_CONCURRENCY
+    started = time.perf_counter()
+    
+    # Créer une instance du service météo partagée par tous les threads
+    owns_service = service is None
+    if owns_service:
+        service = WeatherService(pool_size=max_workers)
+    
+    deadline = DEFAULT_DEADLINE if deadline is None else deadline
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+    end_time = time.monotonic() + deadline
+    fetched = {}
+    
+    # Étape 1 : requêtes groupées pour les villes dont l'identifiant est connu
+    if not use_mock and service.providers:
+        group_futures = [
+            executor.submit(_fetch_group, service, chunk)
+            for chunk in service.group_chunks(cities)
+        ]
+        done, _ = wait(group_futures, timeout=deadline)
+        for future in done:
+            if future.exception():
+                logger.error("Erreur inattendue lors d'une requête groupée", extra={"error": repr(future.exception())})
+                continue
+            for result in future.result():
+                fetched[result["city"]] = result
+    
+    remaining = [city for city in cities if city not in fetched]
+    
+    # Étape 2 (moteur async) : toutes les villes restantes dans une boucle asyncio
+    if (engine or INGESTION_ENGINE) == "async" and not use_mock and service.providers:
+        executor.shutdown(wait=False, cancel_futures=True)
         
-        # Sauvegarder les données dans MongoDB si elles existent
+        # Import local : async_weather_service dépend de ce module
+        from async_weather_service import AsyncWeatherService
+        timings = AsyncWeatherService(service).fetch_many_sync(
+            remaining, timeout=max(0.0, end_time - time.monotonic())
+        )
+        
+        for city in remaining:
+            if city in timings:
+                fetched[city] = _city_result(service, city, *timings[city])
+            else:
+                logger.error(
+                    "Délai dépassé", extra={"city": city, "deadline_s": deadline, "outcome": STATUS_FAILED}
+                )
+                fetched[city] = {"city": city, "status": STATUS_FAILED, "source": None, "latency": deadline, "data": None}
+        remaining = []
+    
+    # Étape 2 : récupération individuelle des villes restantes dans le pool de threads
+    futures = {
+        executor.submit(_fetch_city, service, city, use_mock): city
+        for city in remaining
+    }
+    
+    # Attendre la fin des requêtes sans dépasser l'échéance
+    done, _ = wait(futures, timeout=max(0.0, end_time - time.monotonic()))
+    
+    # Ne pas attendre les requêtes en retard ni démarrer celles en file d'attente
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    for future, city in futures.items():
+        if future not in done:
+            logger.error("Délai dépassé", extra={"city": city, "deadline_s": deadline, "outcome": STATUS_FAILED})
+            fetched[city] = {"city": city, "status": STATUS_FAILED, "source": None, "latency": deadline, "data": None}
+        elif future.exception():
+            logger.error(
+                "Erreur inattendue", extra={"city": city, "error": repr(future.exception()), "outcome": STATUS_FAILED}
+            )
+            fetched[city] = {"city": city, "status": STATUS_FAILED, "source": None, "latency": 0.0, "data": None}
+        else:
+            fetched[city] = future.result()
+    
+    # Sauvegarder toutes les données en une seule écriture groupée
+    results = [fetched[city] for city in cities]
+    docs = []
+    for result in results:
+        data = result.pop("data")
+        result["saved"] = False
         if data:
-            db.save_weather_data(data)
+            docs.append(data)
+    report = db.save_many(docs)
+    
+    # Marquer les villes effectivement sauvegardées
+    failed_saves = {error["city"] for error in report["errors"]}
+    for result in results:
+        if result["status"] in (STATUS_OK, STATUS_MOCK):
+            result["saved"] = result["city"] not in failed_saves
+    
+    # Mémoriser les observations sauvegardées pour ne pas les réécrire
+    for doc in docs:
+        if doc["city"] not in failed_saves:
+            service.response_cache.mark_saved(doc["source"], doc["city"], doc)
+    
+    # Libérer les connexions si le service a été créé pour cette mise à jour,
+    # sinon seulement persister le cache des réponses
+    if owns_service:
+        service.close()
+    else:
+        service.response_cache.save()
+    
+    elapsed = time.perf_counter() - started
+    INGESTION_LATENCY.observe(elapsed)
+    statuses = {}
+    for result in results:
+        INGESTION_CITIES.inc(status=result["status"])
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    
+    # Une ligne de synthèse par mise à jour (le détail par ville est au niveau DEBUG)
+    logger.info(
+        "Mise à jour terminée",
+        extra={"cities": len(cities), **statuses, "saved": report["inserted"], "duration_ms": round(elapsed * 1000, 1)}
+    )
+    
+    return results